@@ -1,18 +1,40 @@
 #!/usr/bin/env python3
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, g, has_request_context, abort
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, bindparam, column, event, func, inspect, or_, table, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, joinedload, selectinload
+from config import Config, init_db_profile
+from serve import serve
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, DecimalField, IntegerField, SelectField, PasswordField, SubmitField
 from wtforms.validators import DataRequired, Email, NumberRange, Length
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timezone
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import wraps
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import logging.handlers
 import os,sys
+import re
+import threading
+import time
 
 PORT=5000
-if len(sys.argv) > 1:
-    PORT=sys.argv[1]
+args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+if args:
+    PORT=args[0]
 
 import socket, platform
 
@@ -62,9 +84,8 @@ END = "\033[0m"
 
 # Initialize Flask app
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///online_shop.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config.from_object(Config)
+init_db_profile(app)
 
 # Initialize extensions
 db = SQLAlchemy(app)
@@ -100,11 +121,17 @@ class Category(db.Model):
 
 class Product(db.Model):
     """Product catalog model"""
+    __table_args__ = (
+        db.Index('ix_product_active_category', 'is_active', 'category_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Numeric(10, 2), nullable=False)
     stock_quantity = db.Column(db.Integer, default=0)
+    # Held by carts (see StockReservation); stock_quantity - reserved_quantity is available to promise
+    reserved_quantity = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
     image_url = db.Column(db.String(200))
     is_active = db.Column(db.Boolean, default=True)
@@ -115,16 +142,42 @@ class Product(db.Model):
     cart_items = db.relationship('CartItem', backref='product', lazy=True)
     stock_movements = db.relationship('StockMovement', backref='product', lazy=True)
 
+    @property
+    def available_quantity(self):
+        return max(self.stock_quantity - self.reserved_quantity, 0)
+
 class CartItem(db.Model):
     """Shopping cart items"""
+    __table_args__ = (
+        db.Index('ix_cart_item_user_product', 'user_id', 'product_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class StockReservation(db.Model):
+    """Stock held for a cart line until it's checked out, removed or expires"""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='uq_stock_reservation_user_product'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
 class Order(db.Model):
     """Order management"""
+    __table_args__ = (
+        db.Index('ix_order_created_at_id', 'created_at', 'id'),
+        db.Index('ix_order_user_created_at', 'user_id', 'created_at'),
+        db.Index('ix_order_status', 'status'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
@@ -141,6 +194,10 @@ class Order(db.Model):
 
 class OrderItem(db.Model):
     """Individual items in an order"""
+    __table_args__ = (
+        db.Index('ix_order_item_order', 'order_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
@@ -150,6 +207,11 @@ class OrderItem(db.Model):
 
 class StockMovement(db.Model):
     """Stock control and inventory tracking"""
+    __table_args__ = (
+        db.Index('ix_stock_movement_created_at_id', 'created_at', 'id'),
+        db.Index('ix_stock_movement_product_created_at', 'product_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     movement_type = db.Column(db.String(50), nullable=False)  # 'in', 'out', 'adjustment'
@@ -159,6 +221,28 @@ class StockMovement(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
 
+class SchemaMigration(db.Model):
+    """Migrations applied to this database, see migrate()"""
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class StoreStats(db.Model):
+    """Dashboard counters, a single row kept up to date by StatsService"""
+    id = db.Column(db.Integer, primary_key=True)
+    total_products = db.Column(db.Integer, nullable=False, default=0)
+    total_orders = db.Column(db.Integer, nullable=False, default=0)
+    total_users = db.Column(db.Integer, nullable=False, default=0)
+    pending_orders = db.Column(db.Integer, nullable=False, default=0)
+    reconciled_at = db.Column(db.DateTime)
+
+class RevenueRollup(db.Model):
+    """Orders and revenue per day (UTC) and order status"""
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
 # ============================================================================
 # FORMS
 # ============================================================================
@@ -203,7 +287,464 @@ class CheckoutForm(FlaskForm):
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return load_identity(int(user_id))
+
+# ============================================================================
+# CREDENTIALS
+# ============================================================================
+
+# Key derivation is deliberately slow: each scrypt hash takes a core and
+# 32 MiB for a fraction of a second. hashlib releases the GIL while deriving,
+# so on request threads a burst of logins would run up to WEB_THREADS
+# derivations at once and starve browsing of CPU. Hashing and verifying run in
+# a small process pool instead (created per worker process, after the gunicorn
+# fork), so at most PASSWORD_HASH_WORKERS derivations per worker compete with
+# page requests; further logins queue for the pool.
+
+class CredentialService:
+    """Password hashing and verification off the request thread"""
+
+    def __init__(self, method, workers, cache_ttl, cache_size=1024):
+        self.method = method
+        self.workers = workers
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._verified = OrderedDict()
+        self._key = os.urandom(32)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _discard_pool(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+
+    def _run(self, function, *args):
+        pool = self._get_pool()
+        try:
+            return pool.submit(function, *args).result()
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            return function(*args)
+
+    def hash_password(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_passwords(self, passwords):
+        """Hash several passwords in parallel"""
+        pool = self._get_pool()
+        try:
+            futures = [pool.submit(generate_password_hash, p, self.method) for p in passwords]
+            return [f.result() for f in futures]
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            return [generate_password_hash(p, self.method) for p in passwords]
+
+    def verify_password(self, password_hash, password):
+        # Remember successful checks only, keyed by a keyed digest of the stored
+        # hash and the password, so no plaintext is kept and a new hash misses
+        key = hmac.new(self._key, f'{password_hash}\0{password}'.encode(), hashlib.sha256).digest()
+        now = time.monotonic()
+        with self._lock:
+            expires = self._verified.get(key)
+            if expires is not None and expires > now:
+                return True
+        if not self._run(check_password_hash, password_hash, password):
+            return False
+        with self._lock:
+            self._verified[key] = now + self.cache_ttl
+            self._verified.move_to_end(key)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return True
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with a different method or work factor than configured"""
+        return password_hash.split('$', 1)[0] != self.method
+
+credentials = CredentialService(app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_HASH_WORKERS'],
+                                app.config['PASSWORD_VERIFY_CACHE_TTL'])
+
+# ============================================================================
+# QUERY BUDGETS
+# ============================================================================
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+def query_budget(max_queries):
+    """Flag views that run more than max_queries SQL statements per request
+
+    Over budget raises AssertionError when testing (or QUERY_BUDGET_STRICT is
+    set) so N+1 regressions fail the tests, and only logs a warning otherwise.
+    Put it above @login_required so loading the user is counted too.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            response = view(*args, **kwargs)
+            count = g.get('query_count', 0)
+            if count > max_queries:
+                message = f'{view.__name__} ran {count} queries (budget {max_queries})'
+                if app.testing or app.config['QUERY_BUDGET_STRICT']:
+                    raise AssertionError(message)
+                app.logger.warning(message)
+            return response
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+# ============================================================================
+# PAGINATION
+# ============================================================================
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+class InvalidCursor(ValueError):
+    """Raised for a pagination cursor that can't be decoded"""
+
+class Page:
+    """One page of a keyset-paginated query"""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+def encode_cursor(values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor, columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError('wrong number of values')
+        # Only scalars may become bound parameters
+        if any(isinstance(v, bool) or not isinstance(v, (str, int, float)) for v in values):
+            raise ValueError('values must be strings or numbers')
+        return [datetime.fromisoformat(v) if isinstance(c.type, db.DateTime) else v
+                for c, v in zip(columns, values)]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {e}') from e
+
+def keyset_paginate(query, columns, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=False, key=None):
+    """Return the page of query after cursor, ordered by columns (a unique key)
+
+    Instead of OFFSET, the cursor holds the key of the last row already seen,
+    so each page is an index range scan whatever its depth. key(row) gives the
+    cursor values when they aren't attributes of the row named after columns.
+    """
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        # Lexicographic (a, b) > (x, y) as a OR chain, which every backend understands
+        condition = None
+        for col, value in reversed(list(zip(columns, values))):
+            after = col < value if descending else col > value
+            condition = after if condition is None else or_(after, and_(col == value, condition))
+        query = query.filter(condition)
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    items = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(key(last) if key else [getattr(last, c.key) for c in columns])
+    return Page(items, next_cursor)
+
+# ============================================================================
+# SEARCH INDEX
+# ============================================================================
+
+# FTS5 index over product name/description, kept in sync by triggers (external
+# content, so the text isn't stored twice). Only name/description edits touch
+# it; stock updates don't. Without SQLite FTS5, search falls back to LIKE.
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5(
+        name, description, content='product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_insert AFTER INSERT ON product BEGIN
+        INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_delete AFTER DELETE ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_update AFTER UPDATE OF name, description ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    # bm25 weights: a hit in the name counts ten times one in the description
+    "INSERT INTO product_fts(product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "INSERT INTO product_fts(product_fts) VALUES ('rebuild')",
+]
+
+product_fts = table('product_fts', column('rowid'), column('rank'))
+search_index_enabled = None
+
+def create_search_index():
+    """Create the product search index (and fill it from existing products) if missing"""
+    global search_index_enabled
+    if db.engine.dialect.name != 'sqlite':
+        search_index_enabled = False
+        return
+    with db.engine.begin() as conn:
+        # The triggers go with the product table, so check for them rather than product_fts
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'product_fts_update'")).first()
+        if not exists:
+            try:
+                for statement in SEARCH_INDEX_DDL:
+                    conn.execute(text(statement))
+            except OperationalError as e:
+                # SQLite built without FTS5
+                print(f"Search index unavailable, using LIKE search: {e}")
+                search_index_enabled = False
+                return
+    search_index_enabled = True
+
+def search_index_available():
+    """Assumed present on SQLite (migrate() creates it) until a search finds it missing"""
+    return search_index_enabled is not False and db.engine.dialect.name == 'sqlite'
+
+def search_index_missing(error):
+    global search_index_enabled
+    print(f"Search index unavailable, using LIKE search: {error}")
+    search_index_enabled = False
+
+def match_expression(search_term):
+    """FTS5 query matching every word of search_term as a prefix ("lap top" -> "lap"* "top"*)"""
+    words = re.findall(r'\w+', search_term)
+    return ' '.join(f'"{word}"*' for word in words)
+
+# ============================================================================
+# CATALOG CACHE
+# ============================================================================
+
+# Read-through cache of catalog reads (product pages, search, categories),
+# stored as plain dicts so any backend can hold them. Every key embeds the
+# catalog version; invalidate() bumps it, which orphans all older entries at
+# once (they then age out by TTL/LRU). Call it after every catalog or stock write.
+
+class LocalCacheBackend:
+    """In-process LRU cache with per-entry TTL (each worker process has its own)
+
+    With a version_path, the version is the mtime of that file, so a bump in
+    one gunicorn worker invalidates the entries of every worker on the host.
+    """
+
+    name = 'local'
+
+    def __init__(self, max_entries, version_path=None):
+        self.max_entries = max_entries
+        self.version_path = version_path
+        self.entries = OrderedDict()
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def get_version(self):
+        if self.version_path is None:
+            return self.version
+        try:
+            return os.stat(self.version_path).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def bump_version(self):
+        with self.lock:
+            if self.version_path is None:
+                self.version += 1
+            else:
+                version = max(time.time_ns(), self.get_version() + 1)
+                with open(self.version_path, 'a'):
+                    os.utime(self.version_path, ns=(version, version))
+            # Entries of older versions can't be hit any more
+            self.entries.clear()
+
+    def size(self):
+        return len(self.entries)
+
+class RedisCacheBackend:
+    """Redis cache shared by every store pod, so they all see the same invalidation
+
+    Eviction is Redis's own: set maxmemory-policy allkeys-lru on the server.
+    """
+
+    name = 'redis'
+    VERSION_KEY = 'catalog:version'
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, ttl):
+        self.client.setex(key, ttl, json.dumps(value))
+
+    def get_version(self):
+        return int(self.client.get(self.VERSION_KEY) or 0)
+
+    def bump_version(self):
+        self.client.incr(self.VERSION_KEY)
+
+    def size(self):
+        return None
+
+class CatalogCache:
+    """Read-through cache in front of CatalogService, with hit/miss counters"""
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_or_load(self, name, args, loader):
+        key = f'catalog:{self.backend.get_version()}:{name}:{json.dumps(args)}'
+        value = self.backend.get(key)
+        if value is not None:
+            with self.lock:
+                self.hits += 1
+            return value
+        with self.lock:
+            self.misses += 1
+        value = loader()
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    def invalidate(self):
+        self.backend.bump_version()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend.name,
+            'version': self.backend.get_version(),
+            'entries': self.backend.size(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+        }
+
+    # Cached CatalogService reads; a product is a dict with the fields the
+    # listing pages and /api/products use
+
+    def products_page(self, category_id=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        def load():
+            page = CatalogService.get_products_page(category_id, with_category=True, cursor=cursor, limit=limit)
+            return {'items': [product_summary(p) for p in page.items], 'next_cursor': page.next_cursor}
+        page = self.get_or_load('products', [category_id, cursor, limit], load)
+        return Page(page['items'], page['next_cursor'])
+
+    def search_products(self, search_term, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        def load():
+            page = CatalogService.search_products(search_term, cursor, limit)
+            return {'items': [product_summary(p) for p in page.items], 'next_cursor': page.next_cursor}
+        page = self.get_or_load('search', [search_term, cursor, limit], load)
+        return Page(page['items'], page['next_cursor'])
+
+    def categories(self):
+        return self.get_or_load('categories', [], lambda: [
+            {'id': c.id, 'name': c.name, 'description': c.description}
+            for c in CatalogService.get_categories()
+        ])
+
+def product_summary(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'description': product.description,
+        'price': float(product.price),
+        'stock_quantity': product.stock_quantity,
+        'image_url': product.image_url,
+        'category': product.category.name if product.category else None,
+    }
+
+def create_cache_backend(url, max_entries):
+    if not url:
+        os.makedirs(app.instance_path, exist_ok=True)
+        return LocalCacheBackend(max_entries, os.path.join(app.instance_path, 'catalog_cache.version'))
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisCacheBackend(url)
+    raise ValueError(f"Unsupported CATALOG_CACHE_URL '{url}', expected redis://...")
+
+catalog_cache = CatalogCache(
+    create_cache_backend(app.config['CATALOG_CACHE_URL'], app.config['CATALOG_CACHE_SIZE']),
+    app.config['CATALOG_CACHE_TTL'])
+
+# ============================================================================
+# USER IDENTITY CACHE
+# ============================================================================
+
+# Every authenticated request loads current_user; routes only look at its id,
+# username and is_admin, so those are cached per worker for USER_CACHE_TTL
+# seconds instead of selected again. A flush that changes or deletes a user
+# evicts it here; other workers catch up within the TTL.
+
+class CachedUser(UserMixin):
+    """The User fields requests need, as current_user"""
+
+    def __init__(self, id, username, is_admin):
+        self.id = id
+        self.username = username
+        self.is_admin = is_admin
+
+user_cache = LocalCacheBackend(app.config['USER_CACHE_SIZE'])
+
+def load_identity(user_id):
+    identity = user_cache.get(user_id)
+    if identity is None:
+        row = db.session.query(User.id, User.username, User.is_admin).filter_by(id=user_id).first()
+        if row is None:
+            return None
+        identity = (row.id, row.username, bool(row.is_admin))
+        user_cache.set(user_id, identity, app.config['USER_CACHE_TTL'])
+    return CachedUser(*identity)
+
+@event.listens_for(Session, 'after_flush')
+def forget_changed_users(db_session, flush_context):
+    for obj in list(db_session.dirty) + list(db_session.deleted):
+        if isinstance(obj, User):
+            user_cache.delete(obj.id)
 
 # ============================================================================
 # BUSINESS LOGIC SERVICES (Designed for future microservice separation)
@@ -213,24 +754,60 @@ class CatalogService:
     """Catalog management service"""
 
     @staticmethod
-    def get_all_products(category_id=None, active_only=True):
+    def _products_query(category_id=None, active_only=True, with_category=False):
         query = Product.query
+        if with_category:
+            query = query.options(joinedload(Product.category))
         if active_only:
             query = query.filter_by(is_active=True)
         if category_id:
             query = query.filter_by(category_id=category_id)
-        return query.all()
+        return query
+
+    @staticmethod
+    def get_all_products(category_id=None, active_only=True, with_category=False):
+        return CatalogService._products_query(category_id, active_only, with_category).all()
+
+    @staticmethod
+    def get_products_page(category_id=None, active_only=True, with_category=False,
+                          cursor=None, limit=DEFAULT_PAGE_SIZE):
+        query = CatalogService._products_query(category_id, active_only, with_category)
+        return keyset_paginate(query, (Product.id,), cursor, limit)
 
     @staticmethod
     def get_product_by_id(product_id):
         return Product.query.get(product_id)
 
     @staticmethod
-    def search_products(search_term):
-        return Product.query.filter(
+    def search_products(search_term, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """Active products matching every word of search_term, best match first"""
+        if not search_index_available():
+            return CatalogService._search_products_like(search_term, cursor, limit)
+        match = match_expression(search_term)
+        if not match:
+            return Page([], None)
+        hits = db.select(product_fts.c.rowid.label('product_id'), product_fts.c.rank.label('rank')) \
+            .where(text('product_fts MATCH :match').bindparams(match=match)).subquery()
+        query = db.session.query(Product, hits.c.rank) \
+            .join(hits, hits.c.product_id == Product.id).filter(Product.is_active == True)
+        try:
+            page = keyset_paginate(query, (hits.c.rank, Product.id), cursor, limit,
+                                   key=lambda row: [row.rank, row.Product.id])
+        except OperationalError as e:
+            if 'product_fts' not in str(e):
+                raise
+            search_index_missing(e.orig)
+            return CatalogService._search_products_like(search_term, cursor, limit)
+        page.items = [row.Product for row in page.items]
+        return page
+
+    @staticmethod
+    def _search_products_like(search_term, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        query = Product.query.filter(
             Product.name.contains(search_term) | 
             Product.description.contains(search_term)
-        ).filter_by(is_active=True).all()
+        ).filter_by(is_active=True)
+        return keyset_paginate(query, (Product.id,), cursor, limit)
 
     @staticmethod
     def get_categories():
@@ -242,14 +819,127 @@ class StockService:
     @staticmethod
     def check_availability(product_id, quantity):
         product = Product.query.get(product_id)
-        return product and product.stock_quantity >= quantity
+        return product and product.available_quantity >= quantity
 
     @staticmethod
-    def reserve_stock(product_id, quantity, reason="Order placement", reference_id=None):
-        product = Product.query.get(product_id)
-        if product and product.stock_quantity >= quantity:
-            product.stock_quantity -= quantity
+    def take_stock(product_id, quantity):
+        """Decrement stock if enough is left, without committing; False on shortfall
+
+        The check and the decrement are one conditional UPDATE, so concurrent
+        buyers can't both pass the check and oversell.
+        """
+        result = db.session.execute(
+            db.update(Product)
+            .where(Product.id == product_id, Product.stock_quantity - Product.reserved_quantity >= quantity)
+            .values(stock_quantity=Product.stock_quantity - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    def take_stock_many(quantities, held=None):
+        """take_stock() for several products ({product_id: quantity}) as one executemany
+
+        held ({product_id: quantity}, from claim_holds()) is stock this buyer
+        had reserved: it is released as part of the same update, and counts as
+        available to them. All or nothing is up to the caller: on False, roll back.
+        """
+        held = held or {}
+        product = Product.__table__
+        statement = product.update() \
+            .where(product.c.id == bindparam('product_id'),
+                   product.c.stock_quantity - product.c.reserved_quantity + bindparam('held') >= bindparam('quantity')) \
+            .values(stock_quantity=product.c.stock_quantity - bindparam('quantity'),
+                    reserved_quantity=product.c.reserved_quantity - bindparam('held'))
+        params = [{'product_id': product_id, 'quantity': quantity, 'held': held.get(product_id, 0)}
+                  for product_id, quantity in sorted(quantities.items())]
+        result = db.session.execute(statement, params)
+        leftover = {product_id: quantity for product_id, quantity in held.items() if product_id not in quantities}
+        StockService._release_reserved(leftover)
+        return result.rowcount == len(params)
+
+    # -- Reservations: soft holds on stock for cart lines, expiring after
+    # RESERVATION_TTL. product.reserved_quantity is the sum of the holds, so
+    # available-to-promise is a read of one row. None of these commit.
+
+    @staticmethod
+    def set_hold(user_id, product_id, quantity):
+        """Make the user's hold on product_id exactly quantity (0 releases it); False on shortfall"""
+        if quantity < 0:
+            return False
+        reservation_sweeper.start()
+        # Deleting the old hold claims it, so the sweeper can't release it concurrently
+        held = db.session.execute(
+            db.delete(StockReservation)
+            .where(StockReservation.user_id == user_id, StockReservation.product_id == product_id)
+            .returning(StockReservation.quantity)
+            .execution_options(synchronize_session=False)
+        ).scalar() or 0
+        delta = quantity - held
+        if delta > 0:
+            result = db.session.execute(
+                db.update(Product)
+                .where(Product.id == product_id, Product.is_active == True,
+                       Product.stock_quantity - Product.reserved_quantity >= delta)
+                .values(reserved_quantity=Product.reserved_quantity + delta)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                return False
+        elif delta < 0:
+            # Only ever give back what this user held
+            StockService._release_reserved({product_id: min(-delta, held)})
+        if quantity > 0:
+            expires_at = datetime.utcnow() + timedelta(seconds=app.config['RESERVATION_TTL'])
+            db.session.add(StockReservation(user_id=user_id, product_id=product_id,
+                                            quantity=quantity, expires_at=expires_at))
+        return True
+
+    @staticmethod
+    def claim_holds(user_id):
+        """Remove all the user's holds, returning {product_id: quantity} still counted as reserved"""
+        rows = db.session.execute(
+            db.delete(StockReservation)
+            .where(StockReservation.user_id == user_id)
+            .returning(StockReservation.product_id, StockReservation.quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return {product_id: quantity for product_id, quantity in rows}
+
+    @staticmethod
+    def release_holds(user_id):
+        StockService._release_reserved(StockService.claim_holds(user_id))
+
+    @staticmethod
+    def release_expired_holds():
+        """Release every expired hold and commit; returns how many were released"""
+        rows = db.session.execute(
+            db.delete(StockReservation)
+            .where(StockReservation.expires_at < datetime.utcnow())
+            .returning(StockReservation.product_id, StockReservation.quantity)
+            .execution_options(synchronize_session=False)
+        ).all()
+        released = {}
+        for product_id, quantity in rows:
+            released[product_id] = released.get(product_id, 0) + quantity
+        StockService._release_reserved(released)
+        db.session.commit()
+        return len(rows)
 
+    @staticmethod
+    def _release_reserved(quantities):
+        if not quantities:
+            return
+        product = Product.__table__
+        statement = product.update() \
+            .where(product.c.id == bindparam('product_id')) \
+            .values(reserved_quantity=product.c.reserved_quantity - bindparam('quantity'))
+        db.session.execute(statement, [{'product_id': product_id, 'quantity': quantity}
+                                       for product_id, quantity in sorted(quantities.items())])
+
+    @staticmethod
+    def reserve_stock(product_id, quantity, reason="Order placement", reference_id=None):
+        if StockService.take_stock(product_id, quantity):
             # Record stock movement
             movement = StockMovement(
                 product_id=product_id,
@@ -260,6 +950,7 @@ class StockService:
             )
             db.session.add(movement)
             db.session.commit()
+            catalog_cache.invalidate()
             return True
         return False
 
@@ -278,25 +969,88 @@ class StockService:
             )
             db.session.add(movement)
             db.session.commit()
+            catalog_cache.invalidate()
             return True
         return False
 
     @staticmethod
-    def get_stock_movements(product_id=None):
-        query = StockMovement.query
+    def get_stock_movements(product_id=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """Stock movements, newest first"""
+        query = StockMovement.query.options(joinedload(StockMovement.product))
         if product_id:
             query = query.filter_by(product_id=product_id)
-        return query.order_by(StockMovement.created_at.desc()).all()
+        return keyset_paginate(query, (StockMovement.created_at, StockMovement.id),
+                               cursor, limit, descending=True)
+
+class CartSnapshot:
+    """A user's cart items joined with their products, loaded in one query
+
+    Totals, availability and the order rows are all computed from it, so
+    nothing goes back to the database per item.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        rows = db.session.query(CartItem, StockReservation.quantity) \
+            .options(joinedload(CartItem.product)) \
+            .outerjoin(StockReservation, and_(StockReservation.user_id == CartItem.user_id,
+                                              StockReservation.product_id == CartItem.product_id)) \
+            .filter(CartItem.user_id == user_id).order_by(CartItem.product_id).all()
+        self.items = [item for item, held in rows]
+        # What this user has on hold counts as available to them
+        self.held = {item.product_id: held or 0 for item, held in rows}
+
+    def __bool__(self):
+        return bool(self.items)
+
+    @property
+    def total(self):
+        return sum((item.product.price * item.quantity for item in self.items), 0)
+
+    def shortfalls(self):
+        """Items asking for more than is available to this user (as of the snapshot)"""
+        return [item for item in self.items
+                if item.product.stock_quantity - item.product.reserved_quantity + self.held[item.product_id]
+                < item.quantity]
+
+    def quantities(self):
+        return {item.product_id: item.quantity for item in self.items}
+
+    def order_items(self, order_id):
+        return [{
+            'order_id': order_id,
+            'product_id': item.product_id,
+            'quantity': item.quantity,
+            'unit_price': item.product.price,
+            'total_price': item.product.price * item.quantity
+        } for item in self.items]
+
+    def stock_movements(self, order_id):
+        return [{
+            'product_id': item.product_id,
+            'movement_type': 'out',
+            'quantity': item.quantity,
+            'reason': f"Order #{order_id}",
+            'reference_id': order_id
+        } for item in self.items]
 
 class CartService:
     """Shopping cart service"""
 
     @staticmethod
     def add_to_cart(user_id, product_id, quantity=1):
+        """Add to the cart and hold the stock for it; False if not enough is available"""
+        if quantity <= 0:
+            return False
         existing_item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
+        new_quantity = (existing_item.quantity if existing_item else 0) + quantity
+
+        if not StockService.set_hold(user_id, product_id, new_quantity):
+            db.session.rollback()
+            return False
 
         if existing_item:
-            existing_item.quantity += quantity
+            existing_item.quantity = new_quantity
         else:
             cart_item = CartItem(user_id=user_id, product_id=product_id, quantity=quantity)
             db.session.add(cart_item)
@@ -304,14 +1058,21 @@ class CartService:
         db.session.commit()
         return True
 
+    @staticmethod
+    def get_cart(user_id):
+        return CartSnapshot(user_id)
+
     @staticmethod
     def get_cart_items(user_id):
-        return CartItem.query.filter_by(user_id=user_id).all()
+        return CartSnapshot(user_id).items
 
     @staticmethod
     def update_cart_item(user_id, product_id, quantity):
         cart_item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
         if cart_item:
+            if not StockService.set_hold(user_id, product_id, max(quantity, 0)):
+                db.session.rollback()
+                return False
             if quantity <= 0:
                 db.session.delete(cart_item)
             else:
@@ -322,49 +1083,31 @@ class CartService:
 
     @staticmethod
     def clear_cart(user_id):
+        StockService.release_holds(user_id)
         CartItem.query.filter_by(user_id=user_id).delete()
         db.session.commit()
 
     @staticmethod
     def get_cart_total(user_id):
-        cart_items = CartService.get_cart_items(user_id)
-        total = 0
-        for item in cart_items:
-            total += item.product.price * item.quantity
-        return total
+        return CartSnapshot(user_id).total
 
 class BillingService:
     """Billing and order management service"""
 
     @staticmethod
     def create_order(user_id, shipping_address, billing_address, payment_method):
-        cart_items = CartService.get_cart_items(user_id)
+        """Place the user's cart as an order, all or nothing, in a single transaction"""
+        cart = CartService.get_cart(user_id)
 
-        if not cart_items:
+        if not cart:
             return None, "Cart is empty"
+        short = cart.shortfalls()
+        if short:
+            return None, f"Insufficient stock for {short[0].product.name}"
 
-        # Calculate total
-        total_amount = 0
-        order_items_data = []
-
-        for cart_item in cart_items:
-            if not StockService.check_availability(cart_item.product_id, cart_item.quantity):
-                return None, f"Insufficient stock for {cart_item.product.name}"
-
-            item_total = cart_item.product.price * cart_item.quantity
-            total_amount += item_total
-
-            order_items_data.append({
-                'product_id': cart_item.product_id,
-                'quantity': cart_item.quantity,
-                'unit_price': cart_item.product.price,
-                'total_price': item_total
-            })
-
-        # Create order
         order = Order(
             user_id=user_id,
-            total_amount=total_amount,
+            total_amount=cart.total,
             shipping_address=shipping_address,
             billing_address=billing_address,
             payment_method=payment_method
@@ -372,38 +1115,41 @@ class BillingService:
         db.session.add(order)
         db.session.flush()  # Get order ID
 
-        # Create order items and reserve stock
-        for item_data in order_items_data:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=item_data['product_id'],
-                quantity=item_data['quantity'],
-                unit_price=item_data['unit_price'],
-                total_price=item_data['total_price']
-            )
-            db.session.add(order_item)
-
-            # Reserve stock
-            StockService.reserve_stock(
-                item_data['product_id'], 
-                item_data['quantity'], 
-                f"Order #{order.id}",
-                order.id
-            )
+        # The snapshot can be stale: the conditional UPDATE has the last word
+        held = StockService.claim_holds(user_id)
+        if not StockService.take_stock_many(cart.quantities(), held):
+            db.session.rollback()
+            short = CartService.get_cart(user_id).shortfalls()
+            name = short[0].product.name if short else 'an item in your cart'
+            return None, f"Insufficient stock for {name}"
 
-        # Clear cart
-        CartService.clear_cart(user_id)
+        db.session.execute(db.insert(OrderItem), cart.order_items(order.id))
+        db.session.execute(db.insert(StockMovement), cart.stock_movements(order.id))
+        CartItem.query.filter_by(user_id=user_id).delete()
 
         db.session.commit()
+        catalog_cache.invalidate()
         return order, None
 
     @staticmethod
-    def get_user_orders(user_id):
-        return Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
+    def get_user_orders(user_id, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """A customer's orders, newest first"""
+        query = Order.query.options(selectinload(Order.order_items)).filter_by(user_id=user_id)
+        return keyset_paginate(query, (Order.created_at, Order.id), cursor, limit, descending=True)
+
+    @staticmethod
+    def get_all_orders(cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """All orders with their customer, newest first"""
+        query = Order.query.options(joinedload(Order.customer))
+        return keyset_paginate(query, (Order.created_at, Order.id), cursor, limit, descending=True)
 
     @staticmethod
     def get_order_by_id(order_id):
-        return Order.query.get(order_id)
+        """Order with its customer and items (and their products) loaded up front"""
+        return Order.query.options(
+            joinedload(Order.customer),
+            selectinload(Order.order_items).joinedload(OrderItem.product)
+        ).filter_by(id=order_id).first()
 
     @staticmethod
     def update_order_status(order_id, status):
@@ -425,34 +1171,290 @@ class BillingService:
             return True
         return False
 
+# ============================================================================
+# RESERVATION SWEEPER
+# ============================================================================
+
+class ReservationSweeper:
+    """Releases expired stock holds every interval seconds
+
+    Started on the first hold, so each worker process (after the gunicorn
+    fork) runs its own; claiming holds by DELETE ... RETURNING means two
+    sweepers never release the same hold twice.
+    """
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='hold-sweeper', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.app.app_context():
+                try:
+                    released = StockService.release_expired_holds()
+                    if released:
+                        self.app.logger.info(f'Released {released} expired stock holds')
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('Releasing expired stock holds failed')
+
+reservation_sweeper = ReservationSweeper(app, app.config['RESERVATION_SWEEP_INTERVAL'])
+
+# ============================================================================
+# DASHBOARD STATS
+# ============================================================================
+
+# The /admin counters and the revenue rollups are maintained incrementally:
+# every flush that adds/deletes products, users or orders, or changes an
+# order's status, adds the deltas in the same transaction. Bulk Core inserts
+# bypass this, so a daily reconcile recounts everything to correct drift.
+
+STATS_ID = 1
+
+class StatsService:
+    """Materialized dashboard counters and revenue rollups"""
+
+    @staticmethod
+    def get_dashboard():
+        # migrate() creates and fills the row (migration 5), so this is one read
+        return db.session.get(StoreStats, STATS_ID) or \
+            StoreStats(id=STATS_ID, total_products=0, total_orders=0, total_users=0, pending_orders=0)
+
+    @staticmethod
+    def get_revenue(days=30):
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        return RevenueRollup.query.filter(RevenueRollup.day >= since, RevenueRollup.order_count > 0) \
+            .order_by(RevenueRollup.day, RevenueRollup.status).all()
+
+    @staticmethod
+    def reconcile():
+        """Recount everything from the source tables and commit; returns the counters that had drifted"""
+        counts = {
+            'total_products': db.session.query(func.count(Product.id)).scalar(),
+            'total_orders': db.session.query(func.count(Order.id)).scalar(),
+            'total_users': db.session.query(func.count(User.id)).scalar(),
+            'pending_orders': db.session.query(func.count(Order.id)).filter(Order.status == 'pending').scalar(),
+        }
+        stats = db.session.get(StoreStats, STATS_ID) or StoreStats(id=STATS_ID)
+        drift = {name: value - (getattr(stats, name) or 0) for name, value in counts.items()
+                 if getattr(stats, name) != value}
+        for name, value in counts.items():
+            setattr(stats, name, value)
+        stats.reconciled_at = datetime.utcnow()
+        db.session.add(stats)
+
+        day = func.date(Order.created_at)
+        rollups = db.session.query(day, Order.status, func.count(Order.id), func.sum(Order.total_amount)) \
+            .group_by(day, Order.status).all()
+        db.session.execute(db.delete(RevenueRollup))
+        if rollups:
+            db.session.execute(db.insert(RevenueRollup), [
+                {'day': date.fromisoformat(d), 'status': status, 'order_count': count, 'revenue': revenue}
+                for d, status, count, revenue in rollups
+            ])
+        db.session.commit()
+        return drift
+
+    @staticmethod
+    def apply_deltas(connection, counters, rollups):
+        if any(counters.values()):
+            connection.execute(
+                db.update(StoreStats).where(StoreStats.id == STATS_ID)
+                .values({getattr(StoreStats, name): getattr(StoreStats, name) + delta
+                         for name, delta in counters.items() if delta})
+            )
+        rows = [{'day': day, 'status': status, 'order_count': count, 'revenue': revenue}
+                for (day, status), (count, revenue) in rollups.items() if count or revenue]
+        if rows:
+            statement = insert(RevenueRollup)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=['day', 'status'],
+                set_={'order_count': RevenueRollup.order_count + statement.excluded.order_count,
+                      'revenue': RevenueRollup.revenue + statement.excluded.revenue}
+            ), rows)
+
+@event.listens_for(Session, 'after_flush')
+def count_stats_changes(db_session, flush_context):
+    counters = {'total_products': 0, 'total_orders': 0, 'total_users': 0, 'pending_orders': 0}
+    rollups = {}
+
+    def count_order(order, status, sign):
+        counters['pending_orders'] += sign * ((status or 'pending') == 'pending')
+        key = (order.created_at.date(), status or 'pending')
+        count, revenue = rollups.get(key, (0, 0))
+        rollups[key] = (count + sign, revenue + sign * order.total_amount)
+
+    for sign, instances in ((1, db_session.new), (-1, db_session.deleted)):
+        for obj in instances:
+            if isinstance(obj, Product):
+                counters['total_products'] += sign
+            elif isinstance(obj, User):
+                counters['total_users'] += sign
+            elif isinstance(obj, Order):
+                counters['total_orders'] += sign
+                count_order(obj, obj.status, sign)
+    for obj in db_session.dirty:
+        if isinstance(obj, Order):
+            history = inspect(obj).attrs.status.history
+            if history.deleted and history.added:
+                count_order(obj, history.deleted[0], -1)
+                count_order(obj, history.added[0], 1)
+
+    StatsService.apply_deltas(db_session.connection(), counters, rollups)
+
+class StatsReconciler:
+    """Runs StatsService.reconcile() once a day at a fixed UTC time (HH:MM)"""
+
+    def __init__(self, app, at):
+        self.app = app
+        self.at = dtime.fromisoformat(at) if at else None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """Start the thread in this process (a thread started before a fork doesn't survive it)"""
+        if self.at is None or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name='stats-reconciler', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _seconds_until_next_run(self):
+        now = datetime.utcnow()
+        next_run = datetime.combine(now.date(), self.at)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def _run(self):
+        while True:
+            time.sleep(self._seconds_until_next_run())
+            with self.app.app_context():
+                try:
+                    drift = StatsService.reconcile()
+                    if drift:
+                        self.app.logger.warning(f'Dashboard counters had drifted: {drift}')
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('Reconciling dashboard counters failed')
+
+stats_reconciler = StatsReconciler(app, app.config['STATS_RECONCILE_AT'])
+
+@app.before_request
+def start_stats_reconciler():
+    # In the process that serves requests: each gunicorn worker, after the fork
+    stats_reconciler.start()
+
+@app.cli.command('reconcile-stats')
+def reconcile_stats_command():
+    """Recount the dashboard counters and revenue rollups (e.g. from a CronJob)"""
+    print(f"Corrected drift: {StatsService.reconcile() or 'none'}")
+
 # ============================================================================
 # ROUTES - FRONTEND STORE
 # ============================================================================
 
 ## -- START OF asciitext hack for wget/curl requests --------------------------------------------------
 
-def ascii(url):
-    #print(f'url={url}')
-    ret = ''
-    if not url.endswith(f':{PORT}/1'):
-        ret = readfile('static/img/store.txt')
+def readfile(path, mode='r'):
+    ifd = open(path, mode)
+    ret=ifd.read()
+    ifd.close()
+    return ret
 
-    sourceip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+# curl probes (liveness checks, load balancers) hit this path hardest, so the
+# banner is read once and the fixed parts of the status line are precomputed
+try:
+    BANNER = readfile('static/img/store.txt')
+except FileNotFoundError:
+    BANNER = ''
+
+STATUS_ONLY_SUFFIX = f':{PORT}/1'
+STATUS_PREFIX = ''
+STATUS_SUFFIX = f' to {serverhost}/{serverip}:{PORT}'
+if image != '':
+    color=''
+    end=''
+    if 'v1' in image: color=CYAN
+    if 'v2' in image: color=GREEN
+    if 'v3' in image: color=RED
+    if color != '':   end=END
+    STATUS_PREFIX = f'[{color}{image}{END}] '
+    STATUS_SUFFIX = f'{STATUS_SUFFIX}{end}'
+STATUS_SUFFIX += '\n'
+
+class RateLimiter:
+    """Allows at most `rate` events per second, counting the ones refused"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._second = 0
+        self._count = 0
+        self._dropped = 0
+
+    def take(self):
+        """None if over the limit, else how many events were refused since the last one allowed"""
+        second = int(time.monotonic())
+        with self._lock:
+            if second != self._second:
+                self._second, self._count = second, 0
+            if self._count >= self.rate:
+                self._dropped += 1
+                return None
+            self._count += 1
+            dropped, self._dropped = self._dropped, 0
+        return dropped
+
+class BufferedStatusHandler(logging.handlers.MemoryHandler):
+    """Buffers status lines, writing them out when full or at least once a second"""
+
+    def __init__(self, capacity, interval=1.0):
+        super().__init__(capacity, flushLevel=logging.ERROR, target=logging.StreamHandler(sys.stdout))
+        self.interval = interval
+        self._flusher = None
+
+    def emit(self, record):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_periodically, name='status-log', daemon=True)
+            self._flusher.start()
+        super().emit(record)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+status_logger = logging.getLogger('status')
+status_logger.setLevel(logging.INFO)
+status_logger.propagate = False
+status_logger.addHandler(BufferedStatusHandler(int(os.getenv('STATUS_LOG_BUFFER', 100))))
+# Checked before logging, so a line over the limit costs no LogRecord
+status_rate = RateLimiter(int(os.getenv('STATUS_LOG_RATE', 50)))
 
-    now = datetime.now(timezone.utc)
-    statusline = f'[{now}] Request from {sourceip} to {serverhost}/{serverip}:{PORT}\n'
-    if image != '':
-        color=''
-        end=''
-        if 'v1' in image: color=CYAN
-        if 'v2' in image: color=GREEN
-        if 'v3' in image: color=RED
-        if color != '':   end=END
-        statusline = f'[{color}{image}{END}] {statusline}{end}'
-
-    ret += statusline
-    print(statusline)
-    return ret
+def ascii(url):
+    sourceip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+    statusline = f'{STATUS_PREFIX}[{datetime.now(timezone.utc)}] Request from {sourceip}{STATUS_SUFFIX}'
+    dropped = status_rate.take()
+    if dropped:
+        status_logger.info('%s [%d status lines suppressed]', statusline[:-1], dropped)
+    elif dropped is not None:
+        status_logger.info(statusline[:-1])
+    if url.endswith(STATUS_ONLY_SUFFIX):
+        return statusline
+    return BANNER + statusline
 
 ## -- END   OF asciitext hack for wget/curl requests --------------------------------------------------
 
@@ -461,41 +1463,38 @@ def statusLine():
     return ascii(request.base_url)
 
 @app.route('/')
+@query_budget(3)
 def index():
-    ua = request.headers.get('User-Agent').lower()
-    print(ua)
+    ua = request.headers.get('User-Agent', '').lower()
     if 'curl/' in ua or 'wget/' in ua or 'httpie/' in ua:
         return ascii(request.base_url)
 
     """Homepage with featured products"""
-    products = CatalogService.get_all_products()
-    categories = CatalogService.get_categories()
+    products = catalog_cache.products_page(limit=8).items
+    categories = catalog_cache.categories()
     return render_template('index.html', products=products, categories=categories)
 
-def readfile(path, mode='r'):
-    ifd = open(path, mode)
-    ret=ifd.read()
-    ifd.close()
-    return ret
-
 #@app.route('/style/custom.css')
 #def style():
 #    return readfile('style/custom.css')
 
 @app.route('/products')
+@query_budget(3)
 def products():
     """Product listing page"""
     category_id = request.args.get('category', type=int)
     search = request.args.get('search', '')
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
 
     if search:
-        products = CatalogService.search_products(search)
+        page = catalog_cache.search_products(search, cursor, limit)
     else:
-        products = CatalogService.get_all_products(category_id)
+        page = catalog_cache.products_page(category_id, cursor, limit)
 
-    categories = CatalogService.get_categories()
-    return render_template('products.html', products=products, categories=categories, 
-                         selected_category=category_id, search=search)
+    categories = catalog_cache.categories()
+    return render_template('products.html', products=page.items, categories=categories, 
+                         selected_category=category_id, search=search, next_cursor=page.next_cursor)
 
 @app.route('/product/<int:product_id>')
 def product_detail(product_id):
@@ -510,23 +1509,25 @@ def product_detail(product_id):
 @login_required
 def add_to_cart(product_id):
     """Add product to cart"""
-    quantity = int(request.form.get('quantity', 1))
+    quantity = request.form.get('quantity', 1, type=int)
+    if not quantity or quantity <= 0:
+        flash('Quantity must be at least 1', 'error')
+        return redirect(url_for('product_detail', product_id=product_id))
 
-    if not StockService.check_availability(product_id, quantity):
+    if not CartService.add_to_cart(current_user.id, product_id, quantity):
         flash('Insufficient stock available', 'error')
         return redirect(url_for('product_detail', product_id=product_id))
 
-    CartService.add_to_cart(current_user.id, product_id, quantity)
     flash('Product added to cart', 'success')
     return redirect(url_for('cart'))
 
 @app.route('/cart')
+@query_budget(2)
 @login_required
 def cart():
     """Shopping cart page"""
-    cart_items = CartService.get_cart_items(current_user.id)
-    total = CartService.get_cart_total(current_user.id)
-    return render_template('cart.html', cart_items=cart_items, total=total)
+    cart = CartService.get_cart(current_user.id)
+    return render_template('cart.html', cart_items=cart.items, total=cart.total)
 
 @app.route('/update_cart', methods=['POST'])
 @login_required
@@ -535,11 +1536,14 @@ def update_cart():
     product_id = int(request.form.get('product_id'))
     quantity = int(request.form.get('quantity'))
 
-    CartService.update_cart_item(current_user.id, product_id, quantity)
-    flash('Cart updated', 'success')
+    if CartService.update_cart_item(current_user.id, product_id, quantity):
+        flash('Cart updated', 'success')
+    else:
+        flash('Insufficient stock available', 'error')
     return redirect(url_for('cart'))
 
 @app.route('/checkout', methods=['GET', 'POST'])
+@query_budget(11)
 @login_required
 def checkout():
     """Checkout process"""
@@ -559,16 +1563,16 @@ def checkout():
         else:
             flash(error, 'error')
 
-    cart_items = CartService.get_cart_items(current_user.id)
-    total = CartService.get_cart_total(current_user.id)
+    cart = CartService.get_cart(current_user.id)
 
-    if not cart_items:
+    if not cart:
         flash('Your cart is empty', 'error')
         return redirect(url_for('cart'))
 
-    return render_template('checkout.html', form=form, cart_items=cart_items, total=total)
+    return render_template('checkout.html', form=form, cart_items=cart.items, total=cart.total)
 
 @app.route('/order_confirmation/<int:order_id>')
+@query_budget(4)
 @login_required
 def order_confirmation(order_id):
     """Order confirmation page"""
@@ -579,11 +1583,13 @@ def order_confirmation(order_id):
     return render_template('order_confirmation.html', order=order)
 
 @app.route('/my_orders')
+@query_budget(3)
 @login_required
 def my_orders():
     """User's order history"""
-    orders = BillingService.get_user_orders(current_user.id)
-    return render_template('my_orders.html', orders=orders)
+    page = BillingService.get_user_orders(current_user.id, request.args.get('cursor'),
+                                          request.args.get('limit', DEFAULT_PAGE_SIZE, type=int))
+    return render_template('my_orders.html', orders=page.items, next_cursor=page.next_cursor)
 
 # ============================================================================
 # ROUTES - AUTHENTICATION
@@ -597,7 +1603,10 @@ def login():
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
 
-        if user and check_password_hash(user.password_hash, form.password.data):
+        if user and credentials.verify_password(user.password_hash, form.password.data):
+            if credentials.needs_rehash(user.password_hash):
+                user.password_hash = credentials.hash_password(form.password.data)
+                db.session.commit()
             login_user(user)
             next_page = request.args.get('next')
             flash('Logged in successfully!', 'success')
@@ -626,7 +1635,7 @@ def register():
         user = User(
             username=form.username.data,
             email=form.email.data,
-            password_hash=generate_password_hash(form.password.data)
+            password_hash=credentials.hash_password(form.password.data)
         )
         db.session.add(user)
         db.session.commit()
@@ -649,6 +1658,7 @@ def logout():
 # ============================================================================
 
 @app.route('/admin')
+@query_budget(3)
 @login_required
 def admin_dashboard():
     """Admin dashboard"""
@@ -657,21 +1667,19 @@ def admin_dashboard():
         return redirect(url_for('index'))
 
     # Dashboard statistics
-    total_products = Product.query.count()
-    total_orders = Order.query.count()
-    total_users = User.query.count()
-    pending_orders = Order.query.filter_by(status='pending').count()
+    stats = StatsService.get_dashboard()
 
-    recent_orders = Order.query.order_by(Order.created_at.desc()).limit(5).all()
+    recent_orders = BillingService.get_all_orders(limit=5).items
 
     return render_template('admin/dashboard.html', 
-                         total_products=total_products,
-                         total_orders=total_orders,
-                         total_users=total_users,
-                         pending_orders=pending_orders,
+                         total_products=stats.total_products,
+                         total_orders=stats.total_orders,
+                         total_users=stats.total_users,
+                         pending_orders=stats.pending_orders,
                          recent_orders=recent_orders)
 
 @app.route('/admin/products')
+@query_budget(2)
 @login_required
 def admin_products():
     """Admin product management"""
@@ -679,8 +1687,10 @@ def admin_products():
         flash('Access denied', 'error')
         return redirect(url_for('index'))
 
-    products = Product.query.all()
-    return render_template('admin/products.html', products=products)
+    page = CatalogService.get_products_page(active_only=False, with_category=True,
+                                            cursor=request.args.get('cursor'),
+                                            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int))
+    return render_template('admin/products.html', products=page.items, next_cursor=page.next_cursor)
 
 @app.route('/admin/product/add', methods=['GET', 'POST'])
 @login_required
@@ -704,6 +1714,7 @@ def admin_add_product():
         )
         db.session.add(product)
         db.session.commit()
+        catalog_cache.invalidate()
 
         flash('Product added successfully!', 'success')
         return redirect(url_for('admin_products'))
@@ -725,6 +1736,7 @@ def admin_edit_product(product_id):
     if form.validate_on_submit():
         form.populate_obj(product)
         db.session.commit()
+        catalog_cache.invalidate()
 
         flash('Product updated successfully!', 'success')
         return redirect(url_for('admin_products'))
@@ -759,6 +1771,7 @@ def admin_add_category():
         )
         db.session.add(category)
         db.session.commit()
+        catalog_cache.invalidate()
 
         flash('Category added successfully!', 'success')
         return redirect(url_for('admin_categories'))
@@ -766,6 +1779,7 @@ def admin_add_category():
     return render_template('admin/category_form.html', form=form, title='Add Category')
 
 @app.route('/admin/orders')
+@query_budget(2)
 @login_required
 def admin_orders():
     """Admin order management"""
@@ -773,10 +1787,12 @@ def admin_orders():
         flash('Access denied', 'error')
         return redirect(url_for('index'))
 
-    orders = Order.query.order_by(Order.created_at.desc()).all()
-    return render_template('admin/orders.html', orders=orders)
+    page = BillingService.get_all_orders(request.args.get('cursor'),
+                                         request.args.get('limit', DEFAULT_PAGE_SIZE, type=int))
+    return render_template('admin/orders.html', orders=page.items, next_cursor=page.next_cursor)
 
 @app.route('/admin/order/<int:order_id>')
+@query_budget(4)
 @login_required
 def admin_order_detail(order_id):
     """Admin order detail view"""
@@ -784,7 +1800,9 @@ def admin_order_detail(order_id):
         flash('Access denied', 'error')
         return redirect(url_for('index'))
 
-    order = Order.query.get_or_404(order_id)
+    order = BillingService.get_order_by_id(order_id)
+    if not order:
+        abort(404)
     return render_template('admin/order_detail.html', order=order)
 
 @app.route('/admin/order/<int:order_id>/update_status', methods=['POST'])
@@ -804,6 +1822,7 @@ def admin_update_order_status(order_id):
     return redirect(url_for('admin_order_detail', order_id=order_id))
 
 @app.route('/admin/stock')
+@query_budget(3)
 @login_required
 def admin_stock():
     """Stock management"""
@@ -811,9 +1830,11 @@ def admin_stock():
         flash('Access denied', 'error')
         return redirect(url_for('index'))
 
-    products = Product.query.all()
-    movements = StockService.get_stock_movements()
-    return render_template('admin/stock.html', products=products, movements=movements)
+    page = CatalogService.get_products_page(active_only=False, cursor=request.args.get('cursor'),
+                                            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int))
+    movements = StockService.get_stock_movements(limit=20).items
+    return render_template('admin/stock.html', products=page.items, movements=movements,
+                           next_cursor=page.next_cursor)
 
 @app.route('/admin/stock/add', methods=['POST'])
 @login_required
@@ -839,16 +1860,60 @@ def admin_add_stock():
 # ============================================================================
 
 @app.route('/api/products')
+@query_budget(1)
 def api_products():
-    """API endpoint for products"""
-    products = CatalogService.get_all_products()
+    """API endpoint for products (?cursor=&limit= for the following pages)"""
+    page = catalog_cache.products_page(cursor=request.args.get('cursor'),
+                                       limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int))
+    return jsonify({
+        'products': [{
+            'id': p['id'],
+            'name': p['name'],
+            'price': p['price'],
+            'stock': p['stock_quantity'],
+            'category': p['category']
+        } for p in page.items],
+        'next_cursor': page.next_cursor
+    })
+
+@app.route('/api/catalog/cache')
+def api_catalog_cache():
+    """Catalog cache hit/miss counters (for this worker process)"""
+    return jsonify(catalog_cache.stats())
+
+@app.route('/api/admin/stats')
+@query_budget(2)
+@login_required
+def api_admin_stats():
+    """Dashboard counters, from a single row"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    stats = StatsService.get_dashboard()
+    return jsonify({
+        'total_products': stats.total_products,
+        'total_orders': stats.total_orders,
+        'total_users': stats.total_users,
+        'pending_orders': stats.pending_orders,
+        'reconciled_at': stats.reconciled_at.isoformat() if stats.reconciled_at else None
+    })
+
+@app.route('/api/admin/revenue')
+@login_required
+def api_admin_revenue():
+    """Orders and revenue per day and status (?days=30)"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    rollups = StatsService.get_revenue(request.args.get('days', 30, type=int))
     return jsonify([{
-        'id': p.id,
-        'name': p.name,
-        'price': float(p.price),
-        'stock': p.stock_quantity,
-        'category': p.category.name if p.category else None
-    } for p in products])
+        'day': r.day.isoformat(),
+        'status': r.status,
+        'orders': r.order_count,
+        'revenue': float(r.revenue)
+    } for r in rollups])
+
+@app.errorhandler(InvalidCursor)
+def invalid_cursor(error):
+    return jsonify({'error': str(error)}), 400
 
 @app.route('/api/stock/<int:product_id>')
 def api_stock_check(product_id):
@@ -858,27 +1923,149 @@ def api_stock_check(product_id):
         return jsonify({
             'product_id': product_id,
             'stock_quantity': product.stock_quantity,
-            'available': product.stock_quantity > 0
+            'reserved_quantity': product.reserved_quantity,
+            'available_to_promise': product.available_quantity,
+            'available': product.available_quantity > 0
         })
     return jsonify({'error': 'Product not found'}), 404
 
+# ============================================================================
+# SCHEMA MIGRATIONS
+# ============================================================================
+
+# create_all() only creates missing tables, so every other schema change is a
+# numbered migration, applied once per database in order and recorded in
+# schema_migration. migrate() also runs them on a brand-new database right
+# after create_all(), so write each one to be a no-op when the schema already
+# has the change (checkfirst, column checks). Never edit a released migration:
+# add a new one.
+
+MIGRATIONS = []
+
+def migration(version, description):
+    def decorator(function):
+        MIGRATIONS.append((version, description, function))
+        return function
+    return decorator
+
+def add_column(conn, column):
+    if column.name not in {c['name'] for c in inspect(conn).get_columns(column.table.name)}:
+        ddl = CreateColumn(column).compile(dialect=conn.dialect)
+        conn.execute(text(f'ALTER TABLE "{column.table.name}" ADD COLUMN {ddl}'))
+
+def create_indexes(conn, *names):
+    indexes = {index.name: index for table in db.metadata.tables.values() for index in table.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+@migration(1, 'Composite indexes for keyset pagination of orders and stock movements')
+def add_pagination_indexes(conn):
+    create_indexes(conn, 'ix_order_created_at_id', 'ix_stock_movement_created_at_id')
+
+@migration(2, 'Product full-text search index')
+def add_search_index(conn):
+    create_search_index()
+
+@migration(3, 'Product.reserved_quantity for stock reservations')
+def add_reserved_quantity(conn):
+    add_column(conn, Product.__table__.c.reserved_quantity)
+
+@migration(4, 'Indexes for cart, order, order item, product and stock movement lookups')
+def add_lookup_indexes(conn):
+    create_indexes(conn, 'ix_cart_item_user_product', 'ix_order_user_created_at', 'ix_order_status',
+                   'ix_order_item_order', 'ix_product_active_category', 'ix_stock_movement_product_created_at')
+
+@migration(5, 'Dashboard counters and revenue rollups from existing orders, products and users')
+def fill_store_stats(conn):
+    StatsService.reconcile()
+
+def migrate():
+    """Create missing tables, then apply pending migrations in order"""
+    db.create_all()
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    db.session.commit()
+    for version, description, function in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+        with db.engine.begin() as conn:
+            function(conn)
+            conn.execute(db.insert(SchemaMigration).values(version=version, description=description,
+                                                           applied_at=datetime.utcnow()))
+        print(f"Applied migration {version}: {description}")
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Bring the database schema up to date"""
+    migrate()
+
+# Service reads whose plan must not be a full table scan (category and the
+# nightly stats recount read whole tables on purpose, so they aren't listed)
+QUERY_PLAN_CHECKS = [
+    ('CatalogService.get_products_page', lambda: CatalogService.get_products_page(category_id=1)),
+    ('CatalogService.search_products', lambda: CatalogService.search_products('lap')),
+    ('CatalogService.get_product_by_id', lambda: CatalogService.get_product_by_id(1)),
+    ('StockService.check_availability', lambda: StockService.check_availability(1, 1)),
+    ('StockService.get_stock_movements', lambda: StockService.get_stock_movements(product_id=1)),
+    ('StockService.get_stock_movements (all)', lambda: StockService.get_stock_movements()),
+    ('CartService.get_cart', lambda: CartService.get_cart(1)),
+    ('BillingService.get_user_orders', lambda: BillingService.get_user_orders(1)),
+    ('BillingService.get_all_orders', lambda: BillingService.get_all_orders()),
+    ('BillingService.get_order_by_id', lambda: BillingService.get_order_by_id(1)),
+    ('StatsService.get_dashboard', lambda: StatsService.get_dashboard()),
+    ('pending orders', lambda: Order.query.filter_by(status='pending').count()),
+]
+
+def check_query_plans():
+    """EXPLAIN QUERY PLAN every statement the QUERY_PLAN_CHECKS run; returns the full scans found"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    full_scans = []
+    for name, call in QUERY_PLAN_CHECKS:
+        statements.clear()
+        event.listen(Engine, 'before_cursor_execute', capture)
+        try:
+            call()
+        finally:
+            event.remove(Engine, 'before_cursor_execute', capture)
+        connection = db.session.connection()
+        for statement, parameters in statements:
+            plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+            details = [row[-1] for row in plan]
+            # "SCAN t" alone walks the whole table; "SCAN t USING INDEX ..." is an ordered index walk
+            scans = [d for d in details if d.startswith('SCAN ') and ' USING ' not in d and 'VIRTUAL TABLE' not in d]
+            print(f"{'FULL SCAN' if scans else 'ok':9} {name}: {'; '.join(details)}")
+            full_scans += [(name, d) for d in scans]
+    db.session.rollback()
+    return full_scans
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if a service query's plan is a full table scan (SQLite)"""
+    if check_query_plans():
+        sys.exit(1)
+
 # ============================================================================
 # INITIALIZATION AND SAMPLE DATA
 # ============================================================================
 
 def init_db():
     """Initialize database with sample data"""
-    db.create_all()
+    migrate()
 
     # Check if data already exists
     if User.query.first():
         return
 
+    admin_hash, customer_hash = credentials.hash_passwords(['admin123', 'customer123'])
+
     # Create admin user
     admin = User(
         username='admin',
         email='admin@shop.com',
-        password_hash=generate_password_hash('admin123'),
+        password_hash=admin_hash,
         is_admin=True
     )
     db.session.add(admin)
@@ -887,7 +2074,7 @@ def init_db():
     user = User(
         username='customer',
         email='customer@shop.com',
-        password_hash=generate_password_hash('customer123')
+        password_hash=customer_hash
     )
     db.session.add(user)
 
@@ -924,8 +2111,15 @@ def init_db():
         db.session.add(product)
 
     db.session.commit()
+    catalog_cache.invalidate()
+    StatsService.reconcile()
     print("Database initialized with sample data!")
 
+def reset_db_connections():
+    """Drop DB connections inherited from the parent process (gunicorn post_fork)"""
+    with app.app_context():
+        db.engine.dispose(close=False)
+
 if __name__ == '__main__':
     with app.app_context():
         init_db()
@@ -933,4 +2127,4 @@ if __name__ == '__main__':
     print("Starting Flask Online Shop...")
     print("Admin credentials: admin / admin123")
     print("Customer credentials: customer / customer123")
-    app.run(debug=True, host='0.0.0.0', port=PORT)
+    serve(app, PORT, post_fork=reset_db_connections)
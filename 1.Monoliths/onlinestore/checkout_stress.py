@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+"""
+Checkout concurrency check: many customers buy the last units of one product at once
+
+    ./checkout_stress.py [--threads 40] [--stock 20]
+
+Runs against a throwaway SQLite database. Every thread places an order for
+one unit of the same product at the same moment; exactly --stock of them
+must succeed and the rest be refused for insufficient stock, leaving the
+product at 0 with one stock movement per order. Exits non-zero otherwise.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+def main():
+    parser = argparse.ArgumentParser(description='Hammer one product with concurrent checkouts')
+    parser.add_argument('--threads', type=int, default=40, help='concurrent customers')
+    parser.add_argument('--stock', type=int, default=20, help='units in stock')
+    options = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='checkout_stress_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'shop.db')}"
+    from app import app, db, init_db, BillingService, CartItem, Order, Product, StockMovement, User
+
+    with app.app_context():
+        init_db()
+        product = Product.query.order_by(Product.id).first()
+        product.stock_quantity = options.stock
+        users = [User(username=f'stress{i}', email=f'stress{i}@example.com', password_hash='-')
+                 for i in range(options.threads)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all(CartItem(user_id=user.id, product_id=product.id, quantity=1) for user in users)
+        db.session.commit()
+        product_id = product.id
+        user_ids = [user.id for user in users]
+
+    barrier = threading.Barrier(len(user_ids))
+    results = Counter()
+    results_lock = threading.Lock()
+
+    def checkout(user_id):
+        with app.app_context():
+            barrier.wait()
+            try:
+                order, error = BillingService.create_order(user_id, 'Stress St 1', 'Stress St 1', 'credit_card')
+                outcome = 'ordered' if order else 'refused'
+            except Exception as e:
+                outcome = f'error: {e!r}'
+        with results_lock:
+            results[outcome] += 1
+
+    threads = [threading.Thread(target=checkout, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        stock = db.session.get(Product, product_id).stock_quantity
+        orders = Order.query.filter(Order.user_id.in_(user_ids)).count()
+        movements = StockMovement.query.filter_by(product_id=product_id, movement_type='out').count()
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    expected = min(options.threads, options.stock)
+    print(f"{options.threads} checkouts of {options.stock} units: {dict(results)}")
+    print(f"orders {orders}, stock left {stock}, stock movements {movements}")
+    if (results['ordered'] != expected or orders != expected or movements != expected
+            or stock != options.stock - expected or set(results) - {'ordered', 'refused'}):
+        print(f"FAIL: expected {expected} orders and {options.stock - expected} units left")
+        sys.exit(1)
+    print('OK: no overselling')
+
+if __name__ == '__main__':
+    main()
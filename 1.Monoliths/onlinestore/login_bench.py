@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""
+Login latency under browse load: password checks in the pool against inline
+
+    ./login_bench.py [--logins 40] [--login-threads 4] [--browsers 4]
+
+Runs against a throwaway SQLite database. --browsers threads keep loading
+the product list while --login-threads threads log in as --logins distinct
+users, first with check_password_hash on the request thread (as login used
+to do), then through the CredentialService process pool. The verification
+cache is off, so every login pays for a full key derivation. Prints p50/p99
+for logins and for the browse requests running alongside them. Exits
+non-zero if a login fails or the pool makes browse p99 worse.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+def percentile(samples, p):
+    return statistics.quantiles(samples, n=100, method='inclusive')[p - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare login and browse p99 with and without the hashing pool')
+    parser.add_argument('--logins', type=int, default=40, help='logins per run, one user each')
+    parser.add_argument('--login-threads', type=int, default=4, help='concurrent logins')
+    parser.add_argument('--browsers', type=int, default=4, help='concurrent product list readers')
+    options = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='login_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'shop.db')}"
+    from app import app, db, init_db, credentials, User
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    credentials.cache_ttl = 0
+    password = 'bench-password'
+    with app.app_context():
+        init_db()
+        password_hash = credentials.hash_password(password)
+        db.session.add_all(User(username=f'bench{i}', email=f'bench{i}@example.com', password_hash=password_hash)
+                           for i in range(options.logins))
+        db.session.commit()
+
+    def run():
+        logins = []
+        browses = []
+        failures = []
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def browser():
+            client = app.test_client()
+            while not done.is_set():
+                start = time.perf_counter()
+                status = client.get('/products').status_code
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    browses.append(elapsed)
+                    if status != 200:
+                        failures.append(f'/products {status}')
+
+        def logger_in(n):
+            for i in range(n, options.logins, options.login_threads):
+                client = app.test_client()
+                start = time.perf_counter()
+                response = client.post('/login', data={'username': f'bench{i}', 'password': password})
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    logins.append(elapsed)
+                    if response.status_code != 302:
+                        failures.append(f'/login {response.status_code}')
+
+        browsers = [threading.Thread(target=browser) for _ in range(options.browsers)]
+        for thread in browsers:
+            thread.start()
+        time.sleep(0.5)
+        loggers = [threading.Thread(target=logger_in, args=(n,)) for n in range(options.login_threads)]
+        for thread in loggers:
+            thread.start()
+        for thread in loggers:
+            thread.join()
+        done.set()
+        for thread in browsers:
+            thread.join()
+        return logins, browses, failures
+
+    results = {}
+    pooled_run = credentials._run
+    for mode in ('inline', 'pool'):
+        # Inline is how login used to work: the key derivation on the request thread
+        credentials._run = (lambda function, *args: function(*args)) if mode == 'inline' else pooled_run
+        results[mode] = run()
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    for mode, (logins, browses, failures) in results.items():
+        print(f"{mode:>6}: login p50 {percentile(logins, 50):7.1f} ms  p99 {percentile(logins, 99):7.1f} ms  |  "
+              f"browse p50 {percentile(browses, 50):7.1f} ms  p99 {percentile(browses, 99):7.1f} ms  "
+              f"({len(browses)} requests)")
+    if any(failures for _, _, failures in results.values()):
+        print(f"FAIL: {[failures for _, _, failures in results.values()]}")
+        sys.exit(1)
+    if percentile(results['pool'][1], 99) > percentile(results['inline'][1], 99):
+        print('FAIL: browse p99 is worse with the hashing pool')
+        sys.exit(1)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
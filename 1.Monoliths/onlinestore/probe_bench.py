@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+"""
+curl probe micro-benchmark: requests/sec on the /1 status path
+
+    ./probe_bench.py [--seconds 3]
+
+Runs in-process against a throwaway SQLite database, with stdout going to a
+line-buffered pipe as it does under a container runtime. Times /1 the way it
+used to work (status line built from scratch and printed on every request)
+and the current path, both as bare view calls and as full requests through
+Flask's test client, and prints requests/sec for each. Exits non-zero if
+the current view is the slower one.
+"""
+
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+def main():
+    parser = argparse.ArgumentParser(description='Requests/sec on the curl status path')
+    parser.add_argument('--seconds', type=float, default=3, help='time per measurement')
+    options = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='probe_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'shop.db')}"
+    from flask import request
+    import app as store
+    from app import app, init_db, readfile, status_logger
+
+    with app.app_context():
+        init_db()
+
+    def old_ascii(url):
+        ret = ''
+        if not url.endswith(f':{store.PORT}/1'):
+            ret = readfile('static/img/store.txt')
+        sourceip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+        now = datetime.now(timezone.utc)
+        statusline = f'[{now}] Request from {sourceip} to {store.serverhost}/{store.serverip}:{store.PORT}\n'
+        if store.image != '':
+            color = ''
+            end = ''
+            if 'v1' in store.image: color = store.CYAN
+            if 'v2' in store.image: color = store.GREEN
+            if 'v3' in store.image: color = store.RED
+            if color != '': end = store.END
+            statusline = f'[{color}{store.image}{store.END}] {statusline}{end}'
+        ret += statusline
+        print(statusline)
+        return ret
+
+    def old_status_line():
+        # Seen as /1 so it skips the banner like the real one did
+        return old_ascii(request.base_url.removesuffix('-before'))
+
+    app.add_url_rule('/1-before', 'status_line_before', old_status_line)
+
+    # A drained pipe stands in for the container's log stream
+    read_fd, write_fd = os.pipe()
+    threading.Thread(target=lambda: [None for _ in iter(lambda: os.read(read_fd, 65536), b'')],
+                     daemon=True).start()
+    log_stream = os.fdopen(write_fd, 'w', buffering=1)
+    for handler in status_logger.handlers:
+        handler.target.setStream(log_stream)
+    client = app.test_client()
+    headers = {'User-Agent': 'curl/8.5.0'}
+    base_url = f'http://localhost:{store.PORT}'
+
+    def rate(call):
+        count = 0
+        deadline = time.perf_counter() + options.seconds
+        while time.perf_counter() < deadline:
+            call()
+            count += 1
+        return count / options.seconds
+
+    def view_rate(path, view):
+        with app.test_request_context(path, base_url=base_url, headers=headers):
+            return rate(view)
+
+    def request_rate(path):
+        def get():
+            if client.get(path, base_url=base_url, headers=headers).status_code != 200:
+                raise SystemExit(f'FAIL: {path} did not answer 200')
+        return rate(get)
+
+    with contextlib.redirect_stdout(log_stream):
+        view_before = view_rate('/1-before', old_status_line)
+        view_after = view_rate('/1', store.statusLine)
+        request_before = request_rate('/1-before')
+        request_after = request_rate('/1')
+    with app.app_context():
+        store.db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"/1 view:    before {view_before:9.0f}/s  after {view_after:9.0f}/s  ({view_after / view_before:.2f}x)")
+    print(f"/1 request: before {request_before:9.0f}/s  after {request_after:9.0f}/s  "
+          f"({request_after / request_before:.2f}x)")
+    if view_after < view_before:
+        print('FAIL: the cached status path is slower')
+        sys.exit(1)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,6 @@ Flask Online Shop - Quick Start Script
 Run this script to start the online shop application.
 """
 
-import os
 import sys
 
 PORT=5002
@@ -31,10 +30,13 @@ def main():
     print("=" * 60)
     print()
 
-    # Import and run the Flask app
+    # Import and run the Flask app (SERVE_MODE=production or --prod for gunicorn)
     try:
-        from online_shop import app
-        app.run(debug=True, host='0.0.0.0', port=PORT)
+        from app import app, init_db, reset_db_connections
+        from serve import serve
+        with app.app_context():
+            init_db()
+        serve(app, PORT, post_fork=reset_db_connections)
     except ImportError:
         print("❌ Error: Could not import the Flask application.")
         print("Make sure you have installed all requirements:")
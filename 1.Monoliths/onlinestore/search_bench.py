@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+"""
+Product search benchmark: the FTS5 index against the old LIKE '%term%' scan
+
+    ./search_bench.py [--products 1000000] [--repeat 5]
+
+Runs against a throwaway SQLite database filled with a synthetic catalog of
+--products products (the search triggers index them as they are inserted).
+Times the first page of CatalogService.search_products and of the LIKE path
+for common words, a prefix, a single SKU and a term nothing matches, and
+prints the median of --repeat runs. Exits non-zero if the index is missing
+or is slower than the scan for the selective terms. The small vocabulary
+makes each common word match a large share of the catalog, so ranking all of
+those hits can cost more than a scan that stops at the first page by id.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+WORDS = ['laptop', 'phone', 'shirt', 'garden', 'book', 'python', 'cable', 'lamp', 'chair', 'desk',
+         'blue', 'red', 'steel', 'wooden', 'pro', 'mini', 'ultra', 'classic', 'kettle', 'sofa',
+         'camera', 'jacket', 'helmet', 'bottle', 'pillow', 'router', 'speaker', 'mirror', 'rug', 'vase']
+
+def main():
+    parser = argparse.ArgumentParser(description='Time FTS product search against LIKE')
+    parser.add_argument('--products', type=int, default=1000000, help='synthetic catalog size')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per search')
+    options = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='search_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'shop.db')}"
+    from app import app, db, init_db, search_index_available, CatalogService, Category, Product
+
+    sku = f'sku{options.products // 2}'
+    terms = {
+        'two common words': 'wooden chair',
+        'common prefix': 'lapt',
+        'single sku': sku,
+        'no match': 'zzyzx',
+    }
+    selective = ('single sku', 'no match')
+
+    with app.app_context():
+        init_db()
+        if not search_index_available():
+            print('FAIL: the product_fts search index is not available')
+            sys.exit(1)
+        category_id = Category.query.first().id
+        rnd = random.Random(1)
+        start = time.perf_counter()
+        for offset in range(0, options.products, 50000):
+            db.session.execute(db.insert(Product), [
+                {'name': f"{' '.join(rnd.choices(WORDS, k=3))} sku{i}",
+                 'description': ' '.join(rnd.choices(WORDS, k=12)),
+                 'price': 10, 'stock_quantity': 1, 'category_id': category_id, 'is_active': True}
+                for i in range(offset, min(offset + 50000, options.products))])
+            db.session.commit()
+        print(f"{options.products} products indexed in {time.perf_counter() - start:.1f} s")
+
+        def timed(search, term):
+            samples = []
+            for _ in range(options.repeat):
+                begin = time.perf_counter()
+                page = search(term)
+                samples.append((time.perf_counter() - begin) * 1000)
+                db.session.remove()
+            return statistics.median(samples), len(page.items)
+
+        results = {}
+        for label, term in terms.items():
+            results[label] = (timed(CatalogService.search_products, term),
+                              timed(CatalogService._search_products_like, term))
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'search':<18} {'term':<14} {'fts ms':>9} {'hits':>5} {'like ms':>9} {'hits':>5}")
+    for label, ((fts_ms, fts_hits), (like_ms, like_hits)) in results.items():
+        print(f"{label:<18} {terms[label]:<14} {fts_ms:9.2f} {fts_hits:5} {like_ms:9.2f} {like_hits:5}")
+    if results['single sku'][0][1] != 1 or results['no match'][0][1] != 0:
+        print(f"FAIL: expected one hit for {sku} and none for {terms['no match']}")
+        sys.exit(1)
+    if any(results[label][0][0] > results[label][1][0] for label in selective):
+        print('FAIL: the search index is slower than the LIKE scan for a selective term')
+        sys.exit(1)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
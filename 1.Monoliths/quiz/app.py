@@ -1,16 +1,29 @@
 #!/usr/bin/env python3
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
+from config import Config, init_db_profile
+from serve import serve
+from sqlalchemy import case, func, inspect, literal, null, select, text, update
+from sqlalchemy.dialects.sqlite import insert
 from datetime import datetime, timedelta, timezone
 import json
 import os, sys
+import atexit
+import heapq
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from collections import namedtuple
 
 import socket, platform
 
 PORT = 5000
-if len(sys.argv) > 1:
-    PORT=sys.argv[1]
+args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+if args:
+    PORT=args[0]
 
 image = os.getenv('CONTAINER_IMAGE', '')
 
@@ -39,6 +52,8 @@ class Participant(db.Model):
     name = db.Column(db.String(100), nullable=False)
     score = db.Column(db.Integer, default=0)
     total_questions = db.Column(db.Integer, default=0)
+    # Persisted score / total_questions * 100 so the leaderboard can use an index
+    percentage = db.Column(db.Float, default=0, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
@@ -56,9 +71,16 @@ class QuizSession(db.Model):
     current_question_index = db.Column(db.Integer, default=0)
     question_start_time = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    # Last question whose timeouts were auto-submitted (-1 = none yet)
+    finalized_question_index = db.Column(db.Integer, default=-1)
 
 # Track answers
 class ParticipantAnswer(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('participant_id', 'question_index', name='uq_participant_answer_participant_question'),
+        db.Index('ix_participant_answer_question_participant', 'question_index', 'participant_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     participant_id = db.Column(db.Integer, db.ForeignKey('participant.id'))
     question_index = db.Column(db.Integer)
@@ -66,16 +88,51 @@ class ParticipantAnswer(db.Model):
     is_correct = db.Column(db.Boolean, default=False)
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-# Load questions from JSON file
+# Question bank: questions.json is parsed once and kept in memory as an
+# immutable tuple of compact records, reloaded only when the file changes
+Question = namedtuple('Question', ['id', 'question', 'options', 'correct_answer'])
+
+class QuestionBank:
+    """Process-wide parsed copy of questions.json"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self.questions = ()
+        self.total_questions = 0
+        self.refresh()
+
+    def _stat_signature(self):
+        st = os.stat(self.path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def refresh(self):
+        """Reload the questions if the file's inode or mtime has changed"""
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return self.questions
+        with self._lock:
+            if signature != self._signature:
+                with open(self.path, 'r') as f:
+                    raw = json.load(f)['questions']
+                questions = tuple(
+                    Question(q.get('id', i), q['question'], tuple(q['options']), q['correct_answer'])
+                    for i, q in enumerate(raw)
+                )
+                self.questions, self.total_questions = questions, len(questions)
+                self._signature = signature
+        return self.questions
+
+question_bank = QuestionBank('questions.json')
+
 def load_questions():
-    with open('questions.json', 'r') as f:
-        return json.load(f)['questions']
+    return question_bank.refresh()
 
 # Create Flask app
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'dev-secret-key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///quiz.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config.from_object(Config)
+init_db_profile(app)
 
 db.init_app(app)
 
@@ -124,28 +181,87 @@ def readfile(path, mode='r'):
     ifd.close()
     return ret
 
-def ascii(url):
-    #print(f'url={url}')
-    ret = ''
-    if not url.endswith(f':{PORT}/1'):
-        ret = readfile('static/img/quiz.txt')
+# curl probes (liveness checks, load balancers) hit this path hardest, so the
+# banner is read once and the fixed parts of the status line are precomputed
+try:
+    BANNER = readfile('static/img/quiz.txt')
+except FileNotFoundError:
+    BANNER = ''
 
-    sourceip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+STATUS_ONLY_SUFFIX = f':{PORT}/1'
+STATUS_PREFIX = ''
+STATUS_SUFFIX = f' to {serverhost}/{serverip}:{PORT}'
+if image != '':
+    color=''
+    end=''
+    if 'v1' in image: color=CYAN
+    if 'v2' in image: color=GREEN
+    if 'v3' in image: color=RED
+    if color != '':   end=END
+    STATUS_PREFIX = f'[{color}{image}{END}] '
+    STATUS_SUFFIX = f'{STATUS_SUFFIX}{end}'
+STATUS_SUFFIX += '\n'
 
-    now = datetime.now(timezone.utc)
-    statusline = f'[{now}] Request from {sourceip} to {serverhost}/{serverip}:{PORT}\n'
-    if image != '':
-        color=''
-        end=''
-        if 'v1' in image: color=CYAN
-        if 'v2' in image: color=GREEN
-        if 'v3' in image: color=RED
-        if color != '':   end=END
-        statusline = f'[{color}{image}{END}] {statusline}{end}'
-
-    ret += statusline
-    print(statusline)
-    return ret
+class RateLimiter:
+    """Allows at most `rate` events per second, counting the ones refused"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._second = 0
+        self._count = 0
+        self._dropped = 0
+
+    def take(self):
+        """None if over the limit, else how many events were refused since the last one allowed"""
+        second = int(time.monotonic())
+        with self._lock:
+            if second != self._second:
+                self._second, self._count = second, 0
+            if self._count >= self.rate:
+                self._dropped += 1
+                return None
+            self._count += 1
+            dropped, self._dropped = self._dropped, 0
+        return dropped
+
+class BufferedStatusHandler(logging.handlers.MemoryHandler):
+    """Buffers status lines, writing them out when full or at least once a second"""
+
+    def __init__(self, capacity, interval=1.0):
+        super().__init__(capacity, flushLevel=logging.ERROR, target=logging.StreamHandler(sys.stdout))
+        self.interval = interval
+        self._flusher = None
+
+    def emit(self, record):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_periodically, name='status-log', daemon=True)
+            self._flusher.start()
+        super().emit(record)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+status_logger = logging.getLogger('status')
+status_logger.setLevel(logging.INFO)
+status_logger.propagate = False
+status_logger.addHandler(BufferedStatusHandler(int(os.getenv('STATUS_LOG_BUFFER', 100))))
+# Checked before logging, so a line over the limit costs no LogRecord
+status_rate = RateLimiter(int(os.getenv('STATUS_LOG_RATE', 50)))
+
+def ascii(url):
+    sourceip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+    statusline = f'{STATUS_PREFIX}[{datetime.now(timezone.utc)}] Request from {sourceip}{STATUS_SUFFIX}'
+    dropped = status_rate.take()
+    if dropped:
+        status_logger.info('%s [%d status lines suppressed]', statusline[:-1], dropped)
+    elif dropped is not None:
+        status_logger.info(statusline[:-1])
+    if url.endswith(STATUS_ONLY_SUFFIX):
+        return statusline
+    return BANNER + statusline
 
 ## -- END   OF asciitext hack for wget/curl requests --------------------------------------------------
 
@@ -155,7 +271,7 @@ def statusLine():
 
 @app.route('/')
 def index():
-    ua = request.headers.get('User-Agent').lower()
+    ua = request.headers.get('User-Agent', '').lower()
     if 'curl/' in ua or 'wget/' in ua or 'httpie/' in ua:
         return ascii(request.base_url)
     return render_template('index.html')
@@ -174,10 +290,12 @@ def start_quiz():
     session['participant_id'] = participant.id
     
     # Set total questions
-    questions = load_questions()
-    participant.total_questions = len(questions)
+    load_questions()
+    participant.total_questions = question_bank.total_questions
     db.session.commit()
     
+    leaderboard_cache.update(participant.to_dict())
+    
     # Reset quiz session if this is the first participant
     quiz_session = get_quiz_session()
     participant_count = Participant.query.count()
@@ -185,11 +303,13 @@ def start_quiz():
         quiz_session.current_question_index = 0
         quiz_session.question_start_time = datetime.utcnow()
         quiz_session.is_active = True
+        quiz_session.finalized_question_index = -1
         db.session.commit()
+    broadcaster.notify()
     
     return jsonify({
         'success': True,
-        'total_questions': len(questions)
+        'total_questions': question_bank.total_questions
     })
 
 @app.route('/quiz')
@@ -205,16 +325,179 @@ def get_question(question_index):
         question = questions[question_index]
         return jsonify({
             'id': question_index,
-            'question': question['question'],
-            'options': question['options'],
-            'correct_answer': question['correct_answer']
+            'question': question.question,
+            'options': question.options,
+            'correct_answer': question.correct_answer
         })
     return jsonify({'error': 'Question not found'}), 404
 
 @app.route('/total_questions')
 def total_questions():
-    questions = load_questions()
-    return jsonify({'total_questions': len(questions)})
+    load_questions()
+    return jsonify({'total_questions': question_bank.total_questions})
+
+def recount_scores(participant_ids):
+    """Recompute score and percentage of the given participants from their recorded answers"""
+    correct_count = select(func.count(ParticipantAnswer.id)).where(
+        ParticipantAnswer.participant_id == Participant.id,
+        ParticipantAnswer.is_correct.is_(True)
+    ).scalar_subquery()
+    db.session.execute(
+        update(Participant)
+        .where(Participant.id.in_(participant_ids))
+        .values(
+            score=correct_count,
+            percentage=case(
+                (Participant.total_questions > 0, correct_count * 100.0 / Participant.total_questions),
+                else_=0
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+## -- Write-behind answer buffer --------------------------------------------------------------
+# Optional (WRITE_BEHIND=1): answers are validated and acknowledged straight
+# away, queued in memory and written by a background thread in group commits,
+# every WRITE_BEHIND_INTERVAL_MS or WRITE_BEHIND_BATCH rows, whichever comes
+# first. A full queue makes submitters wait, then get a 503 to retry later.
+
+class WriteBehindBuffer:
+    """Bounded queue of pending rows, flushed to the DB in group commits
+
+    Each row is queued under a key; wait_for(key) blocks until that key's rows
+    are written. A batch that fails is retried, then written row by row so
+    only the rows that still fail are lost (and logged).
+    """
+
+    def __init__(self, app, flush, interval_ms=50, batch_size=500, max_queue=10000, put_timeout=1.0, retries=3):
+        self.app = app
+        self.flush = flush
+        self.interval = interval_ms / 1000
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._written = threading.Condition(self._lock)
+        self._pending = {}
+        self._thread = None
+        atexit.register(self.close)
+
+    def put(self, row, key=None):
+        """Queue a row; False if the queue stayed full for put_timeout seconds"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+            self._pending[key] = self._pending.get(key, 0) + 1
+        try:
+            self._queue.put((key, row), timeout=self.put_timeout)
+        except queue.Full:
+            self._done([key])
+            return False
+        return True
+
+    def pending(self, key):
+        """True while rows queued under key are not yet written"""
+        with self._lock:
+            return key in self._pending
+
+    def wait_for(self, key, timeout=None):
+        """Block until every row queued under key so far has been written"""
+        with self._written:
+            return self._written.wait_for(lambda: key not in self._pending, timeout)
+
+    def close(self):
+        """Flush whatever is still queued and stop the writer thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _done(self, keys):
+        with self._written:
+            for key in keys:
+                self._pending[key] -= 1
+                if not self._pending[key]:
+                    del self._pending[key]
+            self._written.notify_all()
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, rows):
+        with self.app.app_context():
+            self.flush(rows)
+
+    def _write_batch(self, rows):
+        for attempt in range(1, self.retries + 1):
+            try:
+                self._write(rows)
+                return
+            except Exception:
+                self.app.logger.exception('write-behind: failed to flush %d rows (attempt %d of %d)',
+                                          len(rows), attempt, self.retries)
+                time.sleep(min(self.interval * 2 ** attempt, 5))
+        for row in rows:
+            try:
+                self._write([row])
+            except Exception:
+                self.app.logger.exception('write-behind: dropped row %r', row)
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                if self._stop.is_set():
+                    return
+                continue
+            try:
+                self._write_batch([row for _, row in batch])
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+                self._done([key for key, _ in batch])
+
+def flush_answers(rows):
+    """Group commit of buffered answers (first answer per question wins)"""
+    db.session.execute(
+        insert(ParticipantAnswer).on_conflict_do_nothing(index_elements=['participant_id', 'question_index']),
+        rows
+    )
+    participant_ids = {row['participant_id'] for row in rows}
+    recount_scores(participant_ids)
+    db.session.commit()
+    broadcaster.notify()
+    for participant in Participant.query.filter(Participant.id.in_(participant_ids)):
+        leaderboard_cache.update(participant.to_dict())
+
+answer_buffer = None
+if os.getenv('WRITE_BEHIND', '').lower() in ('1', 'true', 'yes'):
+    answer_buffer = WriteBehindBuffer(
+        app, flush_answers,
+        interval_ms=int(os.getenv('WRITE_BEHIND_INTERVAL_MS', 50)),
+        batch_size=int(os.getenv('WRITE_BEHIND_BATCH', 500)),
+        max_queue=int(os.getenv('WRITE_BEHIND_QUEUE', 10000))
+    )
+
+## -- Write-behind answer buffer --------------------------------------------------------------
+
+def is_index(value, size):
+    """value is an int in range(size); JSON true/false are not indexes"""
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value < size
 
 @app.route('/submit_answer', methods=['POST'])
 def submit_answer():
@@ -229,55 +512,170 @@ def submit_answer():
     
     questions = load_questions()
     
-    if question_index < 0 or question_index >= len(questions):
+    if not is_index(question_index, len(questions)):
         return jsonify({'error': 'Invalid question'}), 400
         
     current_question = questions[question_index]
     
+    # None means the question timed out unanswered
+    if answer_index is not None and not is_index(answer_index, len(current_question.options)):
+        return jsonify({'error': 'Invalid answer'}), 400
+    
     if answer_index is None:
         is_correct = False
     else:
-        is_correct = answer_index == current_question['correct_answer']
+        is_correct = answer_index == current_question.correct_answer
     
     # Find participant
     participant = Participant.query.get(participant_id)
     if not participant:
         return jsonify({'error': 'Participant not found'}), 404
     
-    # Update score
-    if is_correct:
-        participant.score += 1
-    
-    # Record answer
-    existing_answer = ParticipantAnswer.query.filter_by(
-        participant_id=participant.id,
-        question_index=question_index
-    ).first()
+    if answer_buffer is not None:
+        key = (participant.id, question_index)
+        # A repeat answer (still queued, or already written) will be discarded
+        first_answer = not answer_buffer.pending(key) and not db.session.query(
+            ParticipantAnswer.query.filter_by(participant_id=participant.id, question_index=question_index).exists()
+        ).scalar()
+        queued = answer_buffer.put({
+            'participant_id': participant.id,
+            'question_index': question_index,
+            'answer_index': answer_index,
+            'is_correct': is_correct,
+            'submitted_at': datetime.utcnow()
+        }, key=key)
+        if not queued:
+            return jsonify({'error': 'Server busy, please retry'}), 503
+        # The answer is committed within milliseconds; report the score it will give
+        return jsonify({
+            'correct': is_correct,
+            'correct_answer': current_question.correct_answer,
+            'score': participant.score + (1 if first_answer and is_correct else 0),
+            'total_questions': len(questions)
+        })
     
-    if not existing_answer:
-        answer_record = ParticipantAnswer(
+    # Record answer: the first answer (or timeout) for a question wins
+    result = db.session.execute(
+        insert(ParticipantAnswer).values(
             participant_id=participant.id,
             question_index=question_index,
             answer_index=answer_index,
-            is_correct=is_correct
-        )
-        db.session.add(answer_record)
+            is_correct=is_correct,
+            submitted_at=datetime.utcnow()
+        ).on_conflict_do_nothing(index_elements=['participant_id', 'question_index'])
+    )
+    
+    # Update score only if this answer was actually recorded
+    if result.rowcount == 1 and is_correct:
+        participant.score = Participant.score + 1
+        if participant.total_questions:
+            participant.percentage = (Participant.score + 1) * 100.0 / Participant.total_questions
     
     db.session.commit()
+    broadcaster.notify()
+    if result.rowcount == 1 and is_correct:
+        leaderboard_cache.update(participant.to_dict())
     
     return jsonify({
         'correct': is_correct,
-        'correct_answer': current_question['correct_answer'],
+        'correct_answer': current_question.correct_answer,
         'score': participant.score,
         'total_questions': len(questions)
     })
 
-@app.route('/quiz_status')
-def quiz_status():
-    """Get current quiz status"""
-    quiz_session = get_quiz_session()
+MAX_BATCH_ANSWERS = 500
+
+@app.route('/submit_answers', methods=['POST'])
+def submit_answers():
+    """Submit several answers at once, e.g. when replaying after a reconnect"""
+    participant_id = session.get('participant_id')
+    if not participant_id:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    data = request.get_json(silent=True)
+    items = data.get('answers') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({'error': 'Expected a list of answers'}), 400
+    if len(items) > MAX_BATCH_ANSWERS:
+        return jsonify({'error': f'At most {MAX_BATCH_ANSWERS} answers per request'}), 400
+    
     questions = load_questions()
     
+    participant = Participant.query.get(participant_id)
+    if not participant:
+        return jsonify({'error': 'Participant not found'}), 404
+    
+    already_answered = set(db.session.scalars(
+        select(ParticipantAnswer.question_index).where(ParticipantAnswer.participant_id == participant.id)
+    ))
+    
+    # Validate and score everything in one pass
+    now = datetime.utcnow()
+    results = []
+    rows = []
+    for item in items:
+        question_index = item.get('question_id') if isinstance(item, dict) else None
+        answer_index = item.get('answer_index') if isinstance(item, dict) else None
+        if not is_index(question_index, len(questions)):
+            results.append({'question_id': question_index, 'status': 'invalid', 'error': 'Invalid question'})
+            continue
+        if answer_index is not None and not is_index(answer_index, len(questions[question_index].options)):
+            results.append({'question_id': question_index, 'status': 'invalid', 'error': 'Invalid answer'})
+            continue
+        
+        correct_answer = questions[question_index].correct_answer
+        is_correct = answer_index is not None and answer_index == correct_answer
+        result = {'question_id': question_index, 'correct': is_correct, 'correct_answer': correct_answer}
+        if question_index in already_answered:
+            result['status'] = 'duplicate'
+        else:
+            result['status'] = 'recorded'
+            already_answered.add(question_index)
+            rows.append({
+                'participant_id': participant.id,
+                'question_index': question_index,
+                'answer_index': answer_index,
+                'is_correct': is_correct,
+                'submitted_at': now
+            })
+        results.append(result)
+    
+    if rows:
+        # One executemany for all new answers, then recount the score from the
+        # recorded answers so concurrent single submits can't be counted twice
+        db.session.execute(
+            insert(ParticipantAnswer).on_conflict_do_nothing(index_elements=['participant_id', 'question_index']),
+            rows
+        )
+        recount_scores([participant.id])
+        db.session.commit()
+        db.session.refresh(participant)
+        broadcaster.notify()
+        leaderboard_cache.update(participant.to_dict())
+    
+    return jsonify({
+        'results': results,
+        'recorded': len(rows),
+        'score': participant.score,
+        'total_questions': len(questions)
+    })
+
+def finalize_question(quiz_session, question_index):
+    """Claim the timeout finalization of a question; True for exactly one caller"""
+    claimed = db.session.execute(
+        update(QuizSession)
+        .where(QuizSession.id == quiz_session.id,
+               QuizSession.current_question_index == question_index,
+               func.coalesce(QuizSession.finalized_question_index, -1) != question_index)
+        .values(finalized_question_index=question_index)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return claimed == 1
+
+def compute_quiz_status():
+    """Calculate the current quiz status (shared by /quiz_status and /quiz_stream)"""
+    quiz_session = get_quiz_session()
+    
     # Calculate time remaining
     time_remaining = 12
     print(f'time_remaining={time_remaining}')
@@ -286,63 +684,180 @@ def quiz_status():
         print(f'time_remaining={time_remaining} = max(0, {time_remaining - elapsed}')
         time_remaining = max(0, time_remaining - elapsed)
     
-    # Check if all participants have answered
-    total_participants = Participant.query.count()
-    answered_count = ParticipantAnswer.query.filter_by(
-        question_index=quiz_session.current_question_index
-    ).count()
+    # Participant and answer counts in a single round-trip; answers are unique
+    # per (participant, question), so counting rows counts participants
+    question_index = quiz_session.current_question_index
+    participants_subquery = select(func.count()).select_from(Participant).scalar_subquery()
+    answered_subquery = select(func.count()).select_from(ParticipantAnswer).where(
+        ParticipantAnswer.question_index == question_index
+    ).scalar_subquery()
+    total_participants, answered_count = db.session.execute(
+        select(participants_subquery, answered_subquery)
+    ).one()
     
     all_answered = total_participants > 0 and answered_count >= total_participants
     
-    # NEW: Auto-submit for participants who haven't answered when time runs out
-    if time_remaining <= 0 and not all_answered:
-        # Find participants who haven't answered this question
-        answered_participants = [pa.participant_id for pa in 
-                               ParticipantAnswer.query.filter_by(question_index=quiz_session.current_question_index).all()]
-        
-        all_participants = Participant.query.all()
-        for participant in all_participants:
-            if participant.id not in answered_participants:
-                # Auto-submit with no answer (timeout)
-                timeout_answer = ParticipantAnswer(
-                    participant_id=participant.id,
-                    question_index=quiz_session.current_question_index,
-                    answer_index=None,  # NULL means timeout
-                    is_correct=False
-                )
-                db.session.add(timeout_answer)
-        
+    # Auto-submit for participants who haven't answered when time runs out:
+    # one INSERT ... SELECT for everyone missing an answer to this question.
+    # Only the poller that wins the compare-and-set on QuizSession does it.
+    if (time_remaining <= 0 and not all_answered
+            and quiz_session.finalized_question_index != question_index
+            and finalize_question(quiz_session, question_index)):
+        already_answered = select(ParticipantAnswer.participant_id).where(
+            ParticipantAnswer.question_index == question_index
+        )
+        missing = select(
+            Participant.id,
+            literal(question_index),
+            null(),  # NULL means timeout
+            literal(False),
+            literal(datetime.utcnow()),
+        ).where(Participant.id.not_in(already_answered))
+        result = db.session.execute(
+            insert(ParticipantAnswer).from_select(
+                ['participant_id', 'question_index', 'answer_index', 'is_correct', 'submitted_at'],
+                missing,
+            ).on_conflict_do_nothing(index_elements=['participant_id', 'question_index'])
+        )
         db.session.commit()
         
-        # Update counts after auto-submission
-        answered_count = ParticipantAnswer.query.filter_by(
-            question_index=quiz_session.current_question_index
-        ).count()
+        answered_count += result.rowcount
         all_answered = total_participants > 0 and answered_count >= total_participants
     
     # If everyone answered, force progression
     if all_answered:
         time_remaining = 0
     
-    return jsonify({
+    return {
         'current_question_index': quiz_session.current_question_index,
         'time_remaining': time_remaining,
         'all_answered': all_answered,
         'total_participants': total_participants,
         'answered_count': answered_count,
         'is_active': quiz_session.is_active
-    })
+    }
+
+@app.route('/quiz_status')
+def quiz_status():
+    """Get current quiz status"""
+    return jsonify(compute_quiz_status())
+
+## -- Server-push quiz state ------------------------------------------------------------------
+# One broadcaster thread computes the quiz status once per tick (or as soon as
+# something changes) and fans it out to every /quiz_stream client, so the DB
+# cost no longer grows with the number of connected browsers.
+
+class QuizStateBroadcaster:
+    """Computes quiz state once and pushes it to all SSE subscribers"""
+
+    def __init__(self, app, interval=1.0, keepalive=15.0, max_subscribers=16):
+        self.app = app
+        self.interval = interval
+        self.keepalive = keepalive
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._last_key = None
+        self._last_state = None
+
+    def subscribe(self):
+        """A queue of states for a new client, or None if max_subscribers are connected"""
+        q = queue.Queue(maxsize=1)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(q)
+            if self._last_state is not None:
+                q.put_nowait(self._last_state)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='quiz-broadcaster', daemon=True)
+                self._thread.start()
+        self.notify()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def notify(self):
+        """Ask for an immediate recompute, e.g. after an answer or question change"""
+        self._wakeup.set()
+
+    def _publish(self, state):
+        # Only the latest state matters: replace anything a slow client hasn't read yet
+        with self._lock:
+            self._last_state = state
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                q.put_nowait(state)
+            except queue.Full:
+                pass
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            with self._lock:
+                if not self._subscribers:
+                    # Nobody to keep it current: a new client waits for a fresh state
+                    self._last_key = None
+                    self._last_state = None
+                    continue
+            try:
+                with self.app.app_context():
+                    state = compute_quiz_status()
+                    db.session.remove()
+            except Exception as e:
+                print(f'quiz-broadcaster: failed to compute status: {e}')
+                continue
+            # The client only displays whole seconds, so only push when that changes
+            key = tuple((k, int(v) if k == 'time_remaining' else v) for k, v in state.items())
+            if key != self._last_key:
+                self._last_key = key
+                self._publish(json.dumps(state))
+
+    def stream(self, q):
+        try:
+            while True:
+                try:
+                    yield f'data: {q.get(timeout=self.keepalive)}\n\n'
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(q)
+
+broadcaster = QuizStateBroadcaster(app, max_subscribers=app.config['STREAM_MAX_SUBSCRIBERS'])
+
+@app.route('/quiz_stream')
+def quiz_stream():
+    """Server-Sent Events stream of the quiz status"""
+    q = broadcaster.subscribe()
+    if q is None:
+        # The client falls back to polling /quiz_status
+        return jsonify({'error': 'Too many streams, poll /quiz_status'}), 503, {'Retry-After': '30'}
+    return Response(broadcaster.stream(q), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+## -- Server-push quiz state ------------------------------------------------------------------
 
 @app.route('/next_question', methods=['POST'])
 def next_question():
     """Move to next question"""
     quiz_session = get_quiz_session()
-    questions = load_questions()
+    load_questions()
     
-    if quiz_session.current_question_index < len(questions) - 1:
+    if quiz_session.current_question_index < question_bank.total_questions - 1:
         quiz_session.current_question_index += 1
         quiz_session.question_start_time = datetime.utcnow()
         db.session.commit()
+        broadcaster.notify()
         
         return jsonify({
             'success': True,
@@ -351,6 +866,7 @@ def next_question():
     else:
         quiz_session.is_active = False
         db.session.commit()
+        broadcaster.notify()
         return jsonify({
             'success': True,
             'quiz_complete': True
@@ -363,12 +879,15 @@ def reset_quiz():
     quiz_session.current_question_index = 0
     quiz_session.question_start_time = datetime.utcnow()
     quiz_session.is_active = True
+    quiz_session.finalized_question_index = -1
     
     # Clear all data
     ParticipantAnswer.query.delete()
     Participant.query.delete()
     
     db.session.commit()
+    leaderboard_cache.clear()
+    broadcaster.notify()
     return jsonify({'success': True})
 
 @app.route('/debug_reset', methods=['GET'])
@@ -378,11 +897,14 @@ def debug_reset():
     quiz_session.current_question_index = 0
     quiz_session.question_start_time = datetime.utcnow()
     quiz_session.is_active = True
+    quiz_session.finalized_question_index = -1
     
     ParticipantAnswer.query.delete()
     Participant.query.delete()
     
     db.session.commit()
+    leaderboard_cache.clear()
+    broadcaster.notify()
     
     # Clear session
     session.clear()
@@ -407,22 +929,107 @@ def debug_status():
         'session_participant_id': session.get('participant_id')
     })
 
+## -- Leaderboard -----------------------------------------------------------------------------
+# The top entries are kept in memory and updated by start_quiz/submit_answer,
+# so a page view is O(K). The cache is reloaded from the indexed percentage
+# column when it gets old, which picks up answers handled by other workers.
+
+class Leaderboard:
+    """Incrementally maintained top-K participants"""
+
+    def __init__(self, capacity=50, max_age=5.0):
+        self.capacity = capacity
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._loaded_at = None
+
+    @staticmethod
+    def _rank_key(entry):
+        # Highest percentage first, earliest participant first on ties
+        return (entry['percentage'], -entry['id'])
+
+    def _load(self):
+        participants = Participant.query.order_by(
+            Participant.percentage.desc(), Participant.id
+        ).limit(self.capacity).all()
+        self._entries = {p.id: p.to_dict() for p in participants}
+        self._loaded_at = time.monotonic()
+
+    def update(self, entry):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._entries[entry['id']] = entry
+            if len(self._entries) > self.capacity:
+                lowest = min(self._entries.values(), key=self._rank_key)
+                del self._entries[lowest['id']]
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._loaded_at = None
+
+    def top(self, k):
+        k = max(1, min(k, self.capacity))
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age:
+                self._load()
+            return heapq.nlargest(k, self._entries.values(), key=self._rank_key)
+
+leaderboard_cache = Leaderboard()
+
 @app.route('/leaderboard')
 def leaderboard():
-    participants = Participant.query.all()
-    sorted_participants = sorted(
-        participants, 
-        key=lambda p: (p.score / p.total_questions * 100) if p.total_questions > 0 else 0, 
-        reverse=True
-    )[:3]
+    return render_template('leaderboard.html', participants=leaderboard_cache.top(3))
+
+@app.route('/api/leaderboard')
+def api_leaderboard():
+    k = request.args.get('k', 10, type=int)
+    return jsonify({'leaderboard': leaderboard_cache.top(k)})
+
+## -- Leaderboard -----------------------------------------------------------------------------
+
+def upgrade_schema():
+    """Add the columns and indexes that databases created by earlier versions lack"""
+    inspector = inspect(db.engine)
+    participant_columns = {c['name'] for c in inspector.get_columns('participant')}
+    if 'percentage' not in participant_columns:
+        db.session.execute(text('ALTER TABLE participant ADD COLUMN percentage FLOAT DEFAULT 0'))
+        print('Added participant.percentage')
+    if 'finalized_question_index' not in {c['name'] for c in inspector.get_columns('quiz_session')}:
+        db.session.execute(text('ALTER TABLE quiz_session ADD COLUMN finalized_question_index INTEGER DEFAULT -1'))
+        print('Added quiz_session.finalized_question_index')
     
-    return render_template('leaderboard.html', 
-                         participants=[p.to_dict() for p in sorted_participants])
+    # Answers are written with ON CONFLICT, which needs the unique key: keep
+    # the first answer per question (as the app does) and rescore
+    answer_keys = {c['name'] for c in inspector.get_unique_constraints('participant_answer')} | \
+                  {i['name'] for i in inspector.get_indexes('participant_answer') if i['unique']}
+    if 'uq_participant_answer_participant_question' not in answer_keys:
+        first = db.session.query(func.min(ParticipantAnswer.id)) \
+            .group_by(ParticipantAnswer.participant_id, ParticipantAnswer.question_index)
+        removed = ParticipantAnswer.query.filter(ParticipantAnswer.id.notin_(first)).delete(synchronize_session=False)
+        db.session.execute(text('CREATE UNIQUE INDEX uq_participant_answer_participant_question '
+                                'ON participant_answer (participant_id, question_index)'))
+        print(f'Removed {removed} duplicate answers, added uq_participant_answer_participant_question')
+    if 'percentage' not in participant_columns or 'uq_participant_answer_participant_question' not in answer_keys:
+        recount_scores(db.session.scalars(select(Participant.id)).all())
+    db.session.commit()
+    
+    for table in (Participant.__table__, ParticipantAnswer.__table__):
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
 
 # Create database tables
 with app.app_context():
     db.create_all()
+    upgrade_schema()
     get_quiz_session()
 
+def reset_db_connections():
+    """Drop DB connections inherited from the parent process (gunicorn post_fork)"""
+    with app.app_context():
+        db.engine.dispose(close=False)
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=PORT)
+    serve(app, PORT, post_fork=reset_db_connections)
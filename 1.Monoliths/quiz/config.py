@@ -1,9 +1,62 @@
 import os
+import sqlite3
 from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 load_dotenv()
 
+# SQLite pragma profiles, selected with DB_PROFILE
+SQLITE_PROFILES = {
+    # SQLite's own defaults: rollback journal, no busy timeout
+    'default': {},
+    # Concurrent readers alongside a writer
+    'wal': {
+        'journal_mode': 'WAL',
+        'busy_timeout': 5000,          # ms to wait on a locked DB instead of failing
+        'synchronous': 'NORMAL',       # safe with WAL, fsync only at checkpoints
+        'mmap_size': 268435456,        # 256MB
+        'cache_size': -65536,          # negative = KiB, i.e. 64MB
+        'temp_store': 'MEMORY',
+    },
+}
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///quiz.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+    DB_PROFILE = os.environ.get('DB_PROFILE') or 'wal'
+    # Production server (SERVE_MODE=production), see serve.py
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', min(2 * os.cpu_count() + 1, 4)))
+    # Each open SSE stream holds a thread for as long as the browser stays connected
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 32))
+    WEB_KEEPALIVE = int(os.environ.get('WEB_KEEPALIVE', 5))
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 30))
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 20))
+    WEB_ACCESS_LOG = os.environ.get('WEB_ACCESS_LOG', '').lower() in ('1', 'true', 'yes')
+    # Streams per worker process; past this, stream requests get a 503 and the
+    # client polls instead, so half the threads stay free for ordinary requests
+    STREAM_MAX_SUBSCRIBERS = int(os.environ.get('STREAM_MAX_SUBSCRIBERS', WEB_THREADS // 2))
+
+def init_db_profile(app):
+    """Apply the configured SQLite profile to every new DB connection"""
+    profile = app.config['DB_PROFILE']
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{profile}', expected one of {', '.join(SQLITE_PROFILES)}")
+    pragmas = SQLITE_PROFILES[profile]
+
+    @event.listens_for(Engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    print(f"DB profile '{profile}': {app.config['SQLALCHEMY_DATABASE_URI']} {pragmas}")
@@ -5,6 +5,7 @@ cd $( dirname $0 )
 [ -f ~/.venv/flask/bin/activate  ] && source ~/.venv/flask/bin/activate
 
 mv instance/quiz.db instance/quiz.db.bak
+rm -f instance/quiz.db-wal instance/quiz.db-shm
 python3 -m pip install -r requirements.txt
 
 [ -z "$1" ] && set -- 5000
@@ -6,6 +6,7 @@ class QuizApp {
         this.selectedAnswer = null;
         this.answerSubmitted = false;
         this.syncInterval = null;
+        this.eventSource = null;
         this.init();
     }
 
@@ -84,6 +85,39 @@ class QuizApp {
     }
 
     startSync() {
+        // Prefer the server-push stream, fall back to polling /quiz_status
+        if (window.EventSource) {
+            this.startStream();
+        } else {
+            this.startPolling();
+        }
+    }
+
+    startStream() {
+        console.log('Subscribing to /quiz_stream');
+        this.eventSource = new EventSource('/quiz_stream');
+
+        this.eventSource.onmessage = async (event) => {
+            const status = JSON.parse(event.data);
+            console.log('Server status (stream):', status);
+            await this.updateFromServer(status);
+        };
+
+        this.eventSource.onerror = () => {
+            console.warn('Quiz stream failed - falling back to polling');
+            this.stopStream();
+            this.startPolling();
+        };
+    }
+
+    stopStream() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+
+    startPolling() {
         if (this.syncInterval) {
             clearInterval(this.syncInterval);
         }
@@ -281,7 +315,9 @@ class QuizApp {
             
             this.showResult(result, this.selectedAnswer);
             
-            setTimeout(() => this.syncWithServer(), 100);
+            if (!this.eventSource) {
+                setTimeout(() => this.syncWithServer(), 100);
+            }
             
         } catch (error) {
             console.error('Error submitting answer:', error);
@@ -408,6 +444,7 @@ class QuizApp {
         if (this.syncInterval) {
             clearInterval(this.syncInterval);
         }
+        this.stopStream();
     }
 
     showError(message) {
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""
+Quiz status benchmark: the aggregated status query against the old per-row version
+
+    ./status_bench.py [--participants 10000] [--answered 0.5] [--repeat 20]
+
+Runs against a throwaway SQLite database seeded with --participants
+participants, --answered of whom have answered the current question. Times
+the status counts and the timeout auto-submit both ways: the way /quiz_status
+used to do them (two COUNTs, then loading every answer and participant and
+adding one row per missing answer) and with compute_quiz_status(). Exits
+non-zero if the new version is slower or writes a different number of rows.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def old_counts(get_quiz_session, Participant, ParticipantAnswer):
+    question_index = get_quiz_session().current_question_index
+    total_participants = Participant.query.count()
+    answered_count = ParticipantAnswer.query.filter_by(question_index=question_index).count()
+    return total_participants, answered_count
+
+def old_timeouts(db, Participant, ParticipantAnswer, question_index):
+    answered_participants = [pa.participant_id for pa in
+                             ParticipantAnswer.query.filter_by(question_index=question_index).all()]
+    added = 0
+    for participant in Participant.query.all():
+        if participant.id not in answered_participants:
+            db.session.add(ParticipantAnswer(participant_id=participant.id, question_index=question_index,
+                                             answer_index=None, is_correct=False))
+            added += 1
+    db.session.commit()
+    return added
+
+def timed(fn, repeat, before=None):
+    """Median wall time of fn() in ms, and its last result"""
+    samples = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+def main():
+    parser = argparse.ArgumentParser(description='Time quiz status before and after the aggregation rewrite')
+    parser.add_argument('--participants', type=int, default=10000, help='participants to seed')
+    parser.add_argument('--answered', type=float, default=0.5, help='fraction that answered the current question')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs of the status counts')
+    options = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='status_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'quiz.db')}"
+    from sqlalchemy import insert
+    from app import app, db, compute_quiz_status, get_quiz_session, Participant, ParticipantAnswer
+
+    with app.app_context():
+        db.session.execute(insert(Participant), [
+            {'name': f'p{i}', 'score': 0, 'total_questions': 0, 'percentage': 0}
+            for i in range(options.participants)])
+        answered = int(options.participants * options.answered)
+        db.session.execute(insert(ParticipantAnswer), [
+            {'participant_id': i + 1, 'question_index': 0, 'answer_index': 0, 'is_correct': False}
+            for i in range(answered)])
+        db.session.commit()
+        missing = options.participants - answered
+
+        def clear_timeouts():
+            ParticipantAnswer.query.filter(ParticipantAnswer.answer_index.is_(None)).delete()
+            quiz_session = get_quiz_session()
+            quiz_session.current_question_index = 0
+            quiz_session.finalized_question_index = -1
+            db.session.commit()
+
+        def start_question(expired):
+            clear_timeouts()
+            quiz_session = get_quiz_session()
+            quiz_session.question_start_time = datetime.utcnow() - timedelta(seconds=60 if expired else 0)
+            db.session.commit()
+
+        with contextlib.redirect_stdout(io.StringIO()):  # compute_quiz_status prints on every call
+            start_question(expired=False)
+            old_status_ms, _ = timed(
+                lambda: old_counts(get_quiz_session, Participant, ParticipantAnswer), options.repeat)
+            new_status_ms, _ = timed(compute_quiz_status, options.repeat)
+            old_timeout_ms, old_added = timed(
+                lambda: old_timeouts(db, Participant, ParticipantAnswer, 0), 3, clear_timeouts)
+            new_timeout_ms, status = timed(compute_quiz_status, 3, lambda: start_question(expired=True))
+            new_added = status['answered_count'] - answered
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{options.participants} participants, {answered} answered, {missing} timed out")
+    print(f"status counts:       before {old_status_ms:8.2f} ms   after {new_status_ms:8.2f} ms")
+    print(f"timeout auto-submit: before {old_timeout_ms:8.2f} ms   after {new_timeout_ms:8.2f} ms")
+    if old_added != missing or new_added != missing:
+        print(f"FAIL: expected {missing} timeout rows, before added {old_added}, after {new_added}")
+        sys.exit(1)
+    if new_status_ms > old_status_ms or new_timeout_ms > old_timeout_ms:
+        print('FAIL: the aggregated status is slower than the old version')
+        sys.exit(1)
+    print('OK: no regression')
+
+if __name__ == '__main__':
+    main()
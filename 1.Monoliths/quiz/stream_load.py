@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+"""
+Quiz stream load check: status queries per second as /quiz_stream clients connect
+
+    ./stream_load.py [--clients 1,10,50] [--seconds 5]
+
+Runs against a throwaway SQLite database. Opens the given numbers of
+/quiz_stream clients in turn and counts the SQL statements the server runs
+per second while they listen. With one broadcaster computing the status for
+everybody the rate must stay flat; polling /quiz_status once a second would
+cost clients x (statements per poll). Exits non-zero if the rate grows with
+the number of clients.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description='Count status queries while SSE clients listen')
+    parser.add_argument('--clients', default='1,10,50', help='comma separated client counts, ascending')
+    parser.add_argument('--seconds', type=float, default=5, help='measurement window per step')
+    options = parser.parse_args()
+    levels = sorted(int(n) for n in options.clients.split(','))
+
+    workdir = tempfile.mkdtemp(prefix='stream_load_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'quiz.db')}"
+    os.environ['STREAM_MAX_SUBSCRIBERS'] = str(levels[-1])
+    from sqlalchemy import event
+    from app import app, db
+
+    statements = [0]
+    statements_lock = threading.Lock()
+
+    def count_statement(*args):
+        with statements_lock:
+            statements[0] += 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+
+    def listen(connected):
+        response = app.test_client().get('/quiz_stream', buffered=False)
+        if response.status_code != 200:
+            print(f'FAIL: /quiz_stream answered {response.status_code}')
+            os._exit(1)
+        for chunk in response.response:
+            if not connected.is_set():
+                connected.set()
+
+    rates = {}
+    clients = 0
+    with contextlib.redirect_stdout(io.StringIO()):  # compute_quiz_status prints on every call
+        client = app.test_client()
+        client.post('/start_quiz', data={'name': 'stream'})
+        with statements_lock:
+            statements[0] = 0
+        client.get('/quiz_status')
+        per_poll = statements[0]
+
+        for level in levels:
+            while clients < level:
+                connected = threading.Event()
+                threading.Thread(target=listen, args=(connected,), daemon=True).start()
+                connected.wait()
+                clients += 1
+            with statements_lock:
+                statements[0] = 0
+            time.sleep(options.seconds)
+            with statements_lock:
+                rates[level] = statements[0] / options.seconds
+
+    for level, rate in rates.items():
+        print(f"{level:>5} stream clients: {rate:6.1f} statements/s "
+              f"(polling once a second: {level * per_poll:6.1f} statements/s)")
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    if rates[levels[-1]] > 1.5 * rates[levels[0]] + 1:
+        print('FAIL: the status query rate grows with the number of stream clients')
+        sys.exit(1)
+    print('OK: one status computation per tick regardless of clients')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+Answer submit latency: synchronous commit against the write-behind buffer
+
+    ./submit_latency.py [--participants 200] [--threads 16] [--interval-ms 50]
+
+Runs against a throwaway SQLite database. A crowd of participants answers
+every question through /submit_answer from --threads threads at once, first
+with one commit per request, then with WRITE_BEHIND's group commits, and the
+p50/p99 request latency of both is printed. Exits non-zero if a request
+fails, an answer goes missing, or write-behind has the worse p99.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+def percentile(samples, p):
+    return statistics.quantiles(samples, n=100, method='inclusive')[p - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare p99 answer latency with and without write-behind')
+    parser.add_argument('--participants', type=int, default=200, help='participants per run')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent submitters')
+    parser.add_argument('--interval-ms', type=int, default=50, help='write-behind flush interval')
+    options = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='submit_latency_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'quiz.db')}"
+    import app as quiz
+    from app import app, db, load_questions, ParticipantAnswer
+
+    questions = load_questions()
+
+    def run(mode):
+        clients = []
+        for i in range(options.participants):
+            client = app.test_client()
+            client.post('/start_quiz', data={'name': f'{mode}{i}'})
+            clients.append(client)
+        latencies = []
+        failures = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(options.threads)
+
+        def submitter(n):
+            mine = clients[n::options.threads]
+            barrier.wait()
+            for question_index in range(len(questions)):
+                for client in mine:
+                    start = time.perf_counter()
+                    response = client.post('/submit_answer', json={
+                        'question_id': question_index, 'answer_index': question_index % 2})
+                    elapsed = (time.perf_counter() - start) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        if response.status_code != 200:
+                            failures.append(response.status_code)
+
+        threads = [threading.Thread(target=submitter, args=(n,)) for n in range(options.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if quiz.answer_buffer is not None:
+            quiz.answer_buffer.close()
+        return latencies, failures
+
+    results = {}
+    for mode in ('synchronous', 'write-behind'):
+        if mode == 'write-behind':
+            quiz.answer_buffer = quiz.WriteBehindBuffer(app, quiz.flush_answers, interval_ms=options.interval_ms)
+        latencies, failures = run(mode)
+        results[mode] = (percentile(latencies, 50), percentile(latencies, 99), failures)
+
+    with app.app_context():
+        answers = ParticipantAnswer.query.count()
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    expected = 2 * options.participants * len(questions)
+    for mode, (p50, p99, failures) in results.items():
+        print(f"{mode:>12}: p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  failed {len(failures)}")
+    print(f"answers recorded {answers} of {expected}")
+    if answers != expected or any(failures for _, _, failures in results.values()):
+        print('FAIL: requests failed or answers went missing')
+        sys.exit(1)
+    if results['write-behind'][1] > results['synchronous'][1]:
+        print('FAIL: write-behind has the worse p99')
+        sys.exit(1)
+    print('OK: write-behind p99 is no worse than synchronous commit')
+
+if __name__ == '__main__':
+    main()
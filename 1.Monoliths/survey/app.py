@@ -1,16 +1,27 @@
 #!/usr/bin/env python3
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, inspect
+from sqlalchemy.dialects.sqlite import insert
+from config import Config, init_db_profile
+from serve import serve
 from datetime import datetime, timezone
+import atexit
 import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
 
 import os, sys
 import socket, platform
 
 PORT = 5000
-if len(sys.argv) > 1:
-    PORT=sys.argv[1]
+args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+if args:
+    PORT=args[0]
 
 image = os.getenv('CONTAINER_IMAGE', '')
 
@@ -40,6 +51,12 @@ class Participant(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class SurveyResponse(db.Model):
+    # One answer per participant and question: writes upsert on this index,
+    # and the completion check counts a participant's answers from it
+    __table_args__ = (
+        db.Index('ux_survey_response_participant_question', 'participant_id', 'question_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     participant_id = db.Column(db.Integer, db.ForeignKey('participant.id'))
     question_id = db.Column(db.Integer)
@@ -47,16 +64,21 @@ class SurveyResponse(db.Model):
     response = db.Column(db.Text)
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-# Load questions from JSON file
+# Load questions from JSON file (re-read only when it changes)
+_questions_cache = {'mtime': None, 'questions': []}
+
 def load_questions():
-    with open('survey_questions.json', 'r') as f:
-        return json.load(f)['questions']
+    mtime = os.stat('survey_questions.json').st_mtime_ns
+    if _questions_cache['mtime'] != mtime:
+        with open('survey_questions.json', 'r') as f:
+            _questions_cache['questions'] = json.load(f)['questions']
+        _questions_cache['mtime'] = mtime
+    return _questions_cache['questions']
 
 # Create Flask app
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'survey-secret-key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///survey.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config.from_object(Config)
+init_db_profile(app)
 
 db.init_app(app)
 
@@ -97,30 +119,87 @@ def readfile(path, mode='r'):
     ifd.close()
     return ret
 
-## -- START OF asciitext hack for wget/curl requests --------------------------------------------------
+# curl probes (liveness checks, load balancers) hit this path hardest, so the
+# banner is read once and the fixed parts of the status line are precomputed
+try:
+    BANNER = readfile('static/img/survey.txt')
+except FileNotFoundError:
+    BANNER = ''
+
+STATUS_ONLY_SUFFIX = f':{PORT}/1'
+STATUS_PREFIX = ''
+STATUS_SUFFIX = f' to {serverhost}/{serverip}:{PORT}'
+if image != '':
+    color=''
+    end=''
+    if 'v1' in image: color=CYAN
+    if 'v2' in image: color=GREEN
+    if 'v3' in image: color=RED
+    if color != '':   end=END
+    STATUS_PREFIX = f'[{color}{image}{END}] '
+    STATUS_SUFFIX = f'{STATUS_SUFFIX}{end}'
+STATUS_SUFFIX += '\n'
+
+class RateLimiter:
+    """Allows at most `rate` events per second, counting the ones refused"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._second = 0
+        self._count = 0
+        self._dropped = 0
+
+    def take(self):
+        """None if over the limit, else how many events were refused since the last one allowed"""
+        second = int(time.monotonic())
+        with self._lock:
+            if second != self._second:
+                self._second, self._count = second, 0
+            if self._count >= self.rate:
+                self._dropped += 1
+                return None
+            self._count += 1
+            dropped, self._dropped = self._dropped, 0
+        return dropped
+
+class BufferedStatusHandler(logging.handlers.MemoryHandler):
+    """Buffers status lines, writing them out when full or at least once a second"""
+
+    def __init__(self, capacity, interval=1.0):
+        super().__init__(capacity, flushLevel=logging.ERROR, target=logging.StreamHandler(sys.stdout))
+        self.interval = interval
+        self._flusher = None
+
+    def emit(self, record):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_periodically, name='status-log', daemon=True)
+            self._flusher.start()
+        super().emit(record)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+status_logger = logging.getLogger('status')
+status_logger.setLevel(logging.INFO)
+status_logger.propagate = False
+status_logger.addHandler(BufferedStatusHandler(int(os.getenv('STATUS_LOG_BUFFER', 100))))
+# Checked before logging, so a line over the limit costs no LogRecord
+status_rate = RateLimiter(int(os.getenv('STATUS_LOG_RATE', 50)))
 
 def ascii(url):
-    #print(f'url={url}')
-    ret = ''
-    if not url.endswith(f':{PORT}/1'):
-        ret = readfile('static/img/survey.txt')
-
     sourceip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
-
-    now = datetime.now(timezone.utc)
-    statusline = f'[{now}] Request from {sourceip} to {serverhost}/{serverip}:{PORT}\n'
-    if image != '':
-        color=''
-        end=''
-        if 'v1' in image: color=CYAN
-        if 'v2' in image: color=GREEN
-        if 'v3' in image: color=RED
-        if color != '':   end=END
-        statusline = f'[{color}{image}{END}] {statusline}{end}'
-
-    ret += statusline
-    print(statusline)
-    return ret
+    statusline = f'{STATUS_PREFIX}[{datetime.now(timezone.utc)}] Request from {sourceip}{STATUS_SUFFIX}'
+    dropped = status_rate.take()
+    if dropped:
+        status_logger.info('%s [%d status lines suppressed]', statusline[:-1], dropped)
+    elif dropped is not None:
+        status_logger.info(statusline[:-1])
+    if url.endswith(STATUS_ONLY_SUFFIX):
+        return statusline
+    return BANNER + statusline
 
 ## -- END   OF asciitext hack for wget/curl requests --------------------------------------------------
 
@@ -130,8 +209,7 @@ def statusLine():
 
 @app.route('/')
 def index():
-    ua = request.headers.get('User-Agent').lower()
-    print(ua)
+    ua = request.headers.get('User-Agent', '').lower()
     if 'curl/' in ua or 'wget/' in ua or 'httpie/' in ua:
         return ascii(request.base_url)
     return render_template('index.html')
@@ -146,6 +224,7 @@ def start_survey():
     participant = Participant(name=name)
     db.session.add(participant)
     db.session.commit()
+    tally.add_participant()
     
     session['participant_id'] = participant.id
     
@@ -163,120 +242,560 @@ def survey():
 @app.route('/get_questions')
 def get_questions():
     questions = load_questions()
-    return jsonify({'questions': questions})
+    # batch_submit: /submit_survey accepts all the answers in one request
+    return jsonify({'questions': questions, 'batch_submit': True})
 
 @app.route('/total_questions')
 def total_questions():
     questions = load_questions()
     return jsonify({'total_questions': len(questions)})
 
+## -- Write-behind response buffer ------------------------------------------------------------
+# Optional (WRITE_BEHIND=1): responses are validated and acknowledged straight
+# away, queued in memory and written by a background thread in group commits,
+# every WRITE_BEHIND_INTERVAL_MS or WRITE_BEHIND_BATCH rows, whichever comes
+# first. A full queue makes submitters wait, then get a 503 to retry later.
+
+class WriteBehindBuffer:
+    """Bounded queue of pending rows, flushed to the DB in group commits
+
+    Each row is queued under a key; wait_for(key) blocks until that key's rows
+    are written. A batch that fails is retried, then written row by row so
+    only the rows that still fail are lost (and logged).
+    """
+
+    def __init__(self, app, flush, interval_ms=50, batch_size=500, max_queue=10000, put_timeout=1.0, retries=3):
+        self.app = app
+        self.flush = flush
+        self.interval = interval_ms / 1000
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._written = threading.Condition(self._lock)
+        self._pending = {}
+        self._thread = None
+        atexit.register(self.close)
+
+    def put(self, row, key=None):
+        """Queue a row; False if the queue stayed full for put_timeout seconds"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+            self._pending[key] = self._pending.get(key, 0) + 1
+        try:
+            self._queue.put((key, row), timeout=self.put_timeout)
+        except queue.Full:
+            self._done([key])
+            return False
+        return True
+
+    def pending(self, key):
+        """True while rows queued under key are not yet written"""
+        with self._lock:
+            return key in self._pending
+
+    def wait_for(self, key, timeout=None):
+        """Block until every row queued under key so far has been written"""
+        with self._written:
+            return self._written.wait_for(lambda: key not in self._pending, timeout)
+
+    def close(self):
+        """Flush whatever is still queued and stop the writer thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _done(self, keys):
+        with self._written:
+            for key in keys:
+                self._pending[key] -= 1
+                if not self._pending[key]:
+                    del self._pending[key]
+            self._written.notify_all()
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, rows):
+        with self.app.app_context():
+            self.flush(rows)
+
+    def _write_batch(self, rows):
+        for attempt in range(1, self.retries + 1):
+            try:
+                self._write(rows)
+                return
+            except Exception:
+                self.app.logger.exception('write-behind: failed to flush %d rows (attempt %d of %d)',
+                                          len(rows), attempt, self.retries)
+                time.sleep(min(self.interval * 2 ** attempt, 5))
+        for row in rows:
+            try:
+                self._write([row])
+            except Exception:
+                self.app.logger.exception('write-behind: dropped row %r', row)
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                if self._stop.is_set():
+                    return
+                continue
+            try:
+                self._write_batch([row for _, row in batch])
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+                self._done([key for key, _ in batch])
+
+def upsert_responses(rows):
+    """Insert or replace each participant's answer in one statement (no commit)"""
+    stmt = insert(SurveyResponse)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['participant_id', 'question_id'],
+        set_={
+            'question_type': stmt.excluded.question_type,
+            'response': stmt.excluded.response,
+            'submitted_at': stmt.excluded.submitted_at
+        }
+    ), rows)
+
+def flush_responses(rows):
+    """Group commit of buffered responses (the latest response per question wins)"""
+    latest = {}
+    for row in rows:
+        latest[(row['participant_id'], row['question_id'])] = row
+    upsert_responses(list(latest.values()))
+    db.session.commit()
+    for row in latest.values():
+        tally.record(row['participant_id'], row['question_id'], row['response'])
+
+response_buffer = None
+if os.getenv('WRITE_BEHIND', '').lower() in ('1', 'true', 'yes'):
+    response_buffer = WriteBehindBuffer(
+        app, flush_responses,
+        interval_ms=int(os.getenv('WRITE_BEHIND_INTERVAL_MS', 50)),
+        batch_size=int(os.getenv('WRITE_BEHIND_BATCH', 500)),
+        max_queue=int(os.getenv('WRITE_BEHIND_QUEUE', 10000))
+    )
+
+## -- Write-behind response buffer ------------------------------------------------------------
+
 @app.route('/submit_response', methods=['POST'])
 def submit_response():
     participant_id = session.get('participant_id')
     if not participant_id:
         return jsonify({'error': 'Not logged in'}), 401
     
-    data = request.get_json()
-    question_id = data.get('question_id')
-    question_type = data.get('question_type')
-    response = data.get('response')
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
     
-    # Validate response
-    if not response or str(response).strip() == '':
-        return jsonify({'error': 'Response cannot be empty'}), 400
+    # Validate response against the question definitions
+    rows, error = validate_answers([(data.get('question_id'), data.get('response'))], load_questions())
+    if error:
+        return jsonify({'error': error}), 400
+    row = rows[0]
+    row.update(participant_id=participant_id, submitted_at=datetime.utcnow())
     
-    # Check if participant already answered this question
-    existing_response = SurveyResponse.query.filter_by(
-        participant_id=participant_id,
-        question_id=question_id
-    ).first()
-    
-    if existing_response:
-        # Update existing response
-        existing_response.response = response
-    else:
-        # Create new response
-        survey_response = SurveyResponse(
-            participant_id=participant_id,
-            question_id=question_id,
-            question_type=question_type,
-            response=response
-        )
-        db.session.add(survey_response)
+    if response_buffer is not None:
+        queued = response_buffer.put(row, key=participant_id)
+        if not queued:
+            return jsonify({'error': 'Server busy, please retry'}), 503
+        return jsonify({'success': True})
     
+    # Insert, or update the participant's earlier answer to this question
+    upsert_responses([row])
     db.session.commit()
+    tally.record(participant_id, row['question_id'], row['response'])
     
     return jsonify({'success': True})
 
+def validate_answers(answers, questions):
+    """Rows for upsert_responses from (question_id, answer) pairs, or an error message"""
+    by_id = {q['id']: q for q in questions}
+    rows = []
+    for question_id, answer in answers:
+        try:
+            if isinstance(question_id, bool) or not isinstance(question_id, (int, str)):
+                raise ValueError(question_id)
+            question = by_id[int(question_id)]
+        except (KeyError, ValueError):
+            return None, f'Unknown question {question_id}'
+        if not isinstance(answer, str):
+            return None, f'Response to question {question_id} must be text'
+        if answer.strip() == '':
+            return None, f'Response to question {question_id} cannot be empty'
+        if question['type'] != 'text' and answer not in question.get('options', []):
+            return None, f'Invalid option for question {question_id}'
+        rows.append({
+            'question_id': question['id'],
+            'question_type': question['type'],
+            'response': answer
+        })
+    return rows, None
+
 @app.route('/submit_survey', methods=['POST'])
 def submit_survey():
+    """Check completion; with {"responses": {question_id: answer}} save them all first"""
     participant_id = session.get('participant_id')
     if not participant_id:
         return jsonify({'error': 'Not logged in'}), 401
     
-    # Check if all questions are answered
+    # Make sure this participant's buffered responses are committed before counting (or overwriting) them
+    if response_buffer is not None:
+        response_buffer.wait_for(participant_id)
+    
     questions = load_questions()
-    answered_questions = SurveyResponse.query.filter_by(participant_id=participant_id).count()
+    data = request.get_json(silent=True) or {}
+    answers = data.get('responses')
+    rows = []
+    if answers is not None:
+        if not isinstance(answers, dict):
+            return jsonify({'error': 'responses must map question ids to answers'}), 400
+        rows, error = validate_answers(answers.items(), questions)
+        if error:
+            return jsonify({'error': error}), 400
+        submitted_at = datetime.utcnow()
+        for row in rows:
+            row.update(participant_id=participant_id, submitted_at=submitted_at)
+        if rows:
+            upsert_responses(rows)
+    
+    # Check if all questions are answered
+    answered_questions = db.session.query(func.count(SurveyResponse.question_id)).filter(
+        SurveyResponse.participant_id == participant_id,
+        SurveyResponse.question_id.in_([q['id'] for q in questions])
+    ).scalar()
+    db.session.commit()
+    for row in rows:
+        tally.record(participant_id, row['question_id'], row['response'])
     
     if answered_questions < len(questions):
         return jsonify({
             'success': False, 
+            'answered': answered_questions,
+            'total': len(questions),
             'message': f'Please answer all questions. You have answered {answered_questions} out of {len(questions)} questions.'
         })
     
-    return jsonify({'success': True, 'message': 'Thank you for completing the survey!'})
+    return jsonify({'success': True, 'answered': answered_questions, 'total': len(questions),
+                    'message': 'Thank you for completing the survey!'})
 
 @app.route('/results')
 def results():
     return render_template('results.html')
 
-@app.route('/api/results')
-def api_results():
-    questions = load_questions()
+## -- Live tallies ---------------------------------------------------------------------------
+# Response counts per (question_id, option) and the participant count live in
+# memory: built from the DB at startup, then moved by +1/-1 as this process
+# writes. Each participant's counted answer is kept too, so a changed answer
+# decrements its old option without reading it back from the DB. Other worker
+# processes write too, so the tallies are rebuilt from the DB every
+# TALLY_RESYNC_INTERVAL seconds (on the next read, or by any open stream
+# while idle); a write racing a rebuild is corrected by the
+# next one. Non-empty free-text answers are counted under the option None.
+# /api/results/stream pushes each change to live dashboards (SSE).
+
+def text_question_ids():
+    return {q['id'] for q in load_questions() if q['type'] == 'text'}
+
+class SurveyTally:
+    """In-memory response counts, kept current by the write paths"""
+
+    def __init__(self, app, resync_interval):
+        self.app = app
+        self.resync_interval = resync_interval
+        self.counts = {}
+        self.answers = {}
+        self.participants = 0
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """Rebuild from the DB (needs an app context)"""
+        answers = {}
+        text_ids = text_question_ids()
+        for participant_id, question_id, answer in db.session.query(
+                SurveyResponse.participant_id, SurveyResponse.question_id, SurveyResponse.response) \
+                .filter(SurveyResponse.question_id.notin_(text_ids)):
+            answers[(participant_id, question_id)] = answer
+        for participant_id, question_id in db.session.query(
+                SurveyResponse.participant_id, SurveyResponse.question_id) \
+                .filter(SurveyResponse.question_id.in_(text_ids), func.trim(SurveyResponse.response) != ''):
+            answers[(participant_id, question_id)] = None
+        counts = {}
+        for (_, question_id), option in answers.items():
+            counts[(question_id, option)] = counts.get((question_id, option), 0) + 1
+        participants = Participant.query.count()
+        with self._lock:
+            changed = counts != self.counts or participants != self.participants
+            self.counts = counts
+            self.answers = answers
+            self.participants = participants
+            self._loaded_at = time.monotonic()
+        if changed:
+            tally_stream.publish_snapshot()
+
+    def stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.resync_interval
+
+    def ensure_fresh(self):
+        """Rebuild if stale; concurrent callers wait for a single rebuild"""
+        if not self.stale():
+            return
+        with self._load_lock:
+            if self.stale():
+                self.load()
+
+    def record(self, participant_id, question_id, response):
+        """participant_id's answer to question_id is now response"""
+        answer_key = (participant_id, question_id)
+        if question_id not in text_question_ids():
+            counted = [response]
+        elif response and response.strip():
+            counted = [None]
+        else:
+            counted = []
+        with self._lock:
+            previous = [self.answers[answer_key]] if answer_key in self.answers else []
+            if previous == counted:
+                return
+            if counted:
+                self.answers[answer_key] = counted[0]
+            else:
+                del self.answers[answer_key]
+            deltas = [((question_id, option), -1) for option in previous] + \
+                     [((question_id, option), 1) for option in counted]
+            for key, delta in deltas:
+                self.counts[key] = self.counts.get(key, 0) + delta
+                if not self.counts[key]:
+                    del self.counts[key]
+        for (qid, option), delta in deltas:
+            tally_stream.publish({'question_id': qid, 'option': option, 'delta': delta})
+
+    def add_participant(self):
+        with self._lock:
+            self.participants += 1
+        tally_stream.publish({'participants': 1})
+
+    def reset(self):
+        with self._lock:
+            self.counts = {}
+            self.answers = {}
+            self.participants = 0
+        tally_stream.publish_snapshot()
+
+    def question_counts(self):
+        """{question_id: {option: count}}"""
+        result = {}
+        with self._lock:
+            for (question_id, option), count in self.counts.items():
+                result.setdefault(question_id, {})[option] = count
+        return result
+
+    def snapshot(self):
+        return {
+            'participants': self.participants,
+            'counts': [{'question_id': qid, 'option': option, 'count': count}
+                       for (qid, option), count in list(self.counts.items())]
+        }
+
+class TallyStream:
+    """Fans tally deltas out to SSE subscribers
+
+    Each subscriber gets a snapshot first, then deltas. One that falls
+    max_pending deltas behind gets a fresh snapshot instead of the backlog.
+    """
+
+    def __init__(self, max_pending=1000, keepalive=15.0, max_subscribers=16):
+        self.max_pending = max_pending
+        self.keepalive = keepalive
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """A queue of events for a new client, or None if max_subscribers are connected"""
+        q = queue.Queue(maxsize=self.max_pending)
+        q.put_nowait(('snapshot', json.dumps(tally.snapshot())))
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def _send(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # Too far behind: drop the backlog, the snapshot replaces it
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+                q.put_nowait(('snapshot', json.dumps(tally.snapshot())))
+
+    def publish(self, delta):
+        if self._subscribers:
+            self._send(('delta', json.dumps(delta)))
+
+    def publish_snapshot(self):
+        if self._subscribers:
+            self._send(('snapshot', json.dumps(tally.snapshot())))
+
+    def stream(self, q):
+        # Answers sent to other gunicorn workers only reach this worker's tally
+        # on a resync, so a quiet stream triggers one itself
+        timeout = min(self.keepalive, tally.resync_interval)
+        try:
+            while True:
+                try:
+                    event, data = q.get(timeout=timeout)
+                    yield f'event: {event}\ndata: {data}\n\n'
+                except queue.Empty:
+                    with tally.app.app_context():
+                        tally.ensure_fresh()
+                    if q.empty():
+                        yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(q)
+
+tally = SurveyTally(app, app.config['TALLY_RESYNC_INTERVAL'])
+tally_stream = TallyStream(max_subscribers=app.config['STREAM_MAX_SUBSCRIBERS'])
+
+## -- Live tallies ---------------------------------------------------------------------------
+
+## -- Results engine -------------------------------------------------------------------------
+# Option counts and text totals come from the live tallies. The free-text
+# answers themselves come from one windowed query (the latest
+# RESULTS_TEXT_LIMIT per question, truncated to RESULTS_TEXT_MAX_CHARS; older
+# ones are paged by /api/results/<id>/text), kept for RESULTS_CACHE_TTL
+# seconds and computed by one request at a time.
+
+def truncate(text):
+    limit = app.config['RESULTS_TEXT_MAX_CHARS']
+    return text if len(text) <= limit else text[:limit].rstrip() + '…'
+
+def compute_text_samples():
+    """{question_id: [(response_id, text), ...]}, newest first"""
+    text_ids = text_question_ids()
+    position = func.row_number().over(partition_by=SurveyResponse.question_id,
+                                      order_by=SurveyResponse.id.desc()).label('position')
+    latest = db.session.query(SurveyResponse.id, SurveyResponse.question_id, SurveyResponse.response, position) \
+        .filter(SurveyResponse.question_id.in_(text_ids), func.trim(SurveyResponse.response) != '').subquery()
+    texts = {}
+    for response_id, question_id, answer, _ in db.session.query(latest) \
+            .filter(latest.c.position <= app.config['RESULTS_TEXT_LIMIT']).order_by(latest.c.id.desc()):
+        texts.setdefault(question_id, []).append((response_id, truncate(answer)))
+    return texts
+
+_results_lock = threading.Lock()
+_results_cache = {'data': None, 'expires': 0.0}
+
+def cached_text_samples():
+    with _results_lock:
+        if _results_cache['data'] is None or _results_cache['expires'] <= time.monotonic():
+            _results_cache['data'] = compute_text_samples()
+            _results_cache['expires'] = time.monotonic() + app.config['RESULTS_CACHE_TTL']
+        return _results_cache['data']
+
+def clear_results_cache():
+    with _results_lock:
+        _results_cache['data'] = None
+
+def compute_results():
+    tally.ensure_fresh()
+    counts = tally.question_counts()
+    texts = cached_text_samples()
     results_data = {}
-    
-    for question in questions:
+    for question in load_questions():
         question_id = question['id']
-        question_type = question['type']
-        question_text = question['question']
-        
-        # Get all responses for this question
-        responses = SurveyResponse.query.filter_by(question_id=question_id).all()
-        
-        if question_type in ['sentiment', 'yesno']:
-            # Count responses for each option
-            response_counts = {}
-            for response in responses:
-                answer = response.response
-                response_counts[answer] = response_counts.get(answer, 0) + 1
-            
+        if question['type'] in ['sentiment', 'yesno']:
+            response_counts = counts.get(question_id, {})
             results_data[question_id] = {
-                'question': question_text,
-                'type': question_type,
+                'question': question['question'],
+                'type': question['type'],
                 'options': question.get('options', []),
                 'responses': response_counts,
-                'total_responses': len(responses)
+                'total_responses': sum(response_counts.values())
             }
-        elif question_type == 'text':
-            # Collect all text responses
-            text_responses = []
-            for response in responses:
-                if response.response.strip():  # Only include non-empty responses
-                    text_responses.append(response.response)
-            
+        elif question['type'] == 'text':
+            shown = texts.get(question_id, [])
+            total = counts.get(question_id, {}).get(None, 0)
             results_data[question_id] = {
-                'question': question_text,
-                'type': question_type,
-                'responses': text_responses,
-                'total_responses': len(text_responses)
+                'question': question['question'],
+                'type': question['type'],
+                'responses': [answer for _, answer in shown],
+                'total_responses': total,
+                # Pass as ?before= to /api/results/<id>/text for the next page
+                # (the samples may lag the live total by up to RESULTS_CACHE_TTL)
+                'next_before': shown[-1][0] if shown and len(shown) < total else None
             }
-    
-    return jsonify(results_data)
+    return results_data
+
+## -- Results engine -------------------------------------------------------------------------
+
+@app.route('/api/results')
+def api_results():
+    return jsonify(compute_results())
+
+@app.route('/api/results/stream')
+def api_results_stream():
+    """Server-Sent Events: a tally snapshot, then a delta per response change"""
+    tally.ensure_fresh()
+    q = tally_stream.subscribe()
+    if q is None:
+        return jsonify({'error': 'Too many streams, poll /api/results'}), 503, {'Retry-After': '30'}
+    return Response(tally_stream.stream(q), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/results/<int:question_id>/text')
+def api_text_results(question_id):
+    """Older free-text answers for a question, newest first (?before=<id>&limit=)"""
+    limit = max(1, min(request.args.get('limit', app.config['RESULTS_TEXT_LIMIT'], type=int), 100))
+    query = SurveyResponse.query.filter(SurveyResponse.question_id == question_id,
+                                        func.trim(SurveyResponse.response) != '')
+    before = request.args.get('before', type=int)
+    if before:
+        query = query.filter(SurveyResponse.id < before)
+    rows = query.order_by(SurveyResponse.id.desc()).limit(limit + 1).all()
+    return jsonify({
+        'responses': [truncate(r.response) for r in rows[:limit]],
+        'next_before': rows[limit - 1].id if len(rows) > limit else None
+    })
 
 @app.route('/api/participant_count')
 def api_participant_count():
-    total_participants = Participant.query.count()
-    return jsonify({'total_participants': total_participants})
+    tally.ensure_fresh()
+    return jsonify({'total_participants': tally.participants})
 
 @app.route('/debug_reset', methods=['GET'])
 def debug_reset():
@@ -284,13 +803,34 @@ def debug_reset():
     SurveyResponse.query.delete()
     Participant.query.delete()
     db.session.commit()
+    clear_results_cache()
+    tally.reset()
     session.clear()
     return jsonify({'success': True, 'message': 'Survey reset complete'})
 
+def enforce_unique_responses():
+    """Drop duplicate answers (keeping the latest) and add the unique index, on older databases"""
+    index = next(i for i in SurveyResponse.__table__.indexes if i.name == 'ux_survey_response_participant_question')
+    if index.name in {i['name'] for i in inspect(db.engine).get_indexes(SurveyResponse.__tablename__)}:
+        return
+    latest = db.session.query(func.max(SurveyResponse.id)) \
+        .group_by(SurveyResponse.participant_id, SurveyResponse.question_id)
+    removed = SurveyResponse.query.filter(SurveyResponse.id.notin_(latest)).delete(synchronize_session=False)
+    db.session.commit()
+    index.create(db.engine)
+    print(f'Removed {removed} duplicate survey responses, added {index.name}')
+
 # Create database tables
 with app.app_context():
     db.create_all()
+    enforce_unique_responses()
+    tally.load()
+
+def reset_db_connections():
+    """Drop DB connections inherited from the parent process (gunicorn post_fork)"""
+    with app.app_context():
+        db.engine.dispose(close=False)
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=PORT)
+    serve(app, PORT, post_fork=reset_db_connections)
 
@@ -0,0 +1,72 @@
+"""Run the app with the Werkzeug dev server or a production WSGI server
+
+    ./app.py [PORT] [--dev|--prod]
+
+SERVE_MODE=production (or --prod) runs the app under gunicorn with several
+worker processes, each serving requests on a pool of threads.
+SERVE_MODE=dev (the default, or --dev) keeps the Werkzeug dev server.
+
+gthread workers give each in-flight request a thread, and an SSE stream is a
+request that never ends: a worker holds at most WEB_THREADS connections, and
+requests past that wait in its queue. The apps that stream cap their
+subscribers per worker (STREAM_MAX_SUBSCRIBERS) below WEB_THREADS and answer
+503 past the cap, so a pod serves up to WEB_WORKERS x STREAM_MAX_SUBSCRIBERS
+streaming browsers; raise WEB_THREADS for bigger audiences.
+"""
+
+import os
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+def serve_mode(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if '--prod' in argv:
+        return 'production'
+    if '--dev' in argv:
+        return 'dev'
+    return os.getenv('SERVE_MODE', 'dev')
+
+class ProductionServer(BaseApplication):
+    """gunicorn configured from the Flask app's WEB_* settings"""
+
+    def __init__(self, app, port, post_fork=None):
+        self.application = app
+        self.port = port
+        self.post_fork_hook = post_fork
+        super().__init__()
+
+    def load_config(self):
+        config = self.application.config
+        self.cfg.set('bind', f'0.0.0.0:{self.port}')
+        self.cfg.set('worker_class', 'gthread')
+        self.cfg.set('workers', config['WEB_WORKERS'])
+        self.cfg.set('threads', config['WEB_THREADS'])
+        self.cfg.set('keepalive', config['WEB_KEEPALIVE'])
+        self.cfg.set('timeout', config['WEB_TIMEOUT'])
+        self.cfg.set('graceful_timeout', config['WEB_GRACEFUL_TIMEOUT'])
+        self.cfg.set('accesslog', '-' if config['WEB_ACCESS_LOG'] else None)
+        if self.post_fork_hook:
+            self.cfg.set('post_fork', lambda server, worker: self.post_fork_hook())
+
+    def load(self):
+        return self.application
+
+def serve(app, port, post_fork=None):
+    """Start serving; post_fork runs in each gunicorn worker right after it is forked"""
+    mode = serve_mode()
+    if mode == 'production':
+        config = app.config
+        print(f"Serving with gunicorn on port {port}: {config['WEB_WORKERS']} workers x "
+              f"{config['WEB_THREADS']} threads, keepalive {config['WEB_KEEPALIVE']}s, "
+              f"graceful shutdown {config['WEB_GRACEFUL_TIMEOUT']}s")
+        ProductionServer(app, port, post_fork).run()
+        return
+
+    if mode != 'dev':
+        print(f"Unknown SERVE_MODE '{mode}', using the dev server")
+    if os.getenv('CONTAINER_IMAGE'):
+        print('WARNING: running the Werkzeug development server inside a container '
+              f"({os.getenv('CONTAINER_IMAGE')}); set SERVE_MODE=production")
+    debug = os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes')
+    app.run(debug=debug, host='0.0.0.0', port=port, threaded=True)
@@ -4,6 +4,9 @@ class SurveyApp {
         this.totalQuestions = 0;
         this.questions = [];
         this.responses = {};
+        // When the server supports it, answers are kept here and sent in one
+        // request by submitSurvey() instead of one request per answer
+        this.batchSubmit = false;
         this.init();
     }
 
@@ -70,6 +73,7 @@ class SurveyApp {
             const data = await response.json();
             
             this.questions = data.questions;
+            this.batchSubmit = data.batch_submit === true;
             this.totalQuestions = this.questions.length;
             
             console.log('Total questions:', this.totalQuestions);
@@ -158,8 +162,10 @@ class SurveyApp {
         button.classList.add('selected');
         this.responses[questionId] = option;
         
-        // Save response immediately
-        this.saveResponse(questionId, 'option', option);
+        // Save response immediately (unless it goes with the whole survey)
+        if (!this.batchSubmit) {
+            this.saveResponse(questionId, 'option', option);
+        }
     }
 
     async saveResponse(questionId, questionType, response) {
@@ -209,7 +215,9 @@ class SurveyApp {
                 return false;
             }
             this.responses[currentQuestion.id] = textResponse;
-            await this.saveResponse(currentQuestion.id, 'text', textResponse);
+            if (!this.batchSubmit) {
+                await this.saveResponse(currentQuestion.id, 'text', textResponse);
+            }
         } else {
             if (!this.responses[currentQuestion.id]) {
                 this.showError('Please select an option before continuing.');
@@ -224,13 +232,18 @@ class SurveyApp {
     async submitSurvey() {
         if (await this.saveCurrentResponse()) {
             try {
-                const response = await fetch('/submit_survey', {
-                    method: 'POST'
-                });
+                const request = { method: 'POST' };
+                if (this.batchSubmit) {
+                    request.headers = { 'Content-Type': 'application/json' };
+                    request.body = JSON.stringify({ responses: this.responses });
+                }
+                const response = await fetch('/submit_survey', request);
 
                 const result = await response.json();
                 
-                if (result.success) {
+                if (result.error) {
+                    this.showError(result.error);
+                } else if (result.success) {
                     this.showCompletion(result.message);
                 } else {
                     this.showError(result.message);
@@ -304,6 +317,10 @@ async function loadSurveyResults() {
                         }
                     </div>
                     <p><strong>Total responses:</strong> ${questionData.total_responses}</p>
+                    ${questionData.next_before ?
+                      `<button class="btn btn-secondary" onclick="loadMoreTextResponses(this, ${questionId}, ${questionData.next_before})">Show older responses</button>` :
+                      ''
+                    }
                 `;
             } else {
                 // Create chart for sentiment/yesno questions
@@ -329,6 +346,27 @@ async function loadSurveyResults() {
     }
 }
 
+async function loadMoreTextResponses(button, questionId, before) {
+    try {
+        const response = await fetch(`/api/results/${questionId}/text?before=${before}`);
+        const page = await response.json();
+        const list = button.parentElement.querySelector('.text-responses');
+        page.responses.forEach(text => {
+            const item = document.createElement('div');
+            item.className = 'text-response-item';
+            item.textContent = text;
+            list.appendChild(item);
+        });
+        if (page.next_before) {
+            button.onclick = () => loadMoreTextResponses(button, questionId, page.next_before);
+        } else {
+            button.remove();
+        }
+    } catch (error) {
+        console.error('Error loading more responses:', error);
+    }
+}
+
 function createPieChart(questionId, questionData) {
     const ctx = document.getElementById(`chart-${questionId}`).getContext('2d');
     
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+"""
+Response submit latency: synchronous commit against the write-behind buffer
+
+    ./submit_latency.py [--participants 200] [--threads 16] [--interval-ms 50]
+
+Runs against a throwaway SQLite database. A crowd of participants answers
+every question through /submit_response from --threads threads at once, first
+with one commit per request, then with WRITE_BEHIND's group commits, and the
+p50/p99 request latency of both is printed. Exits non-zero if a request
+fails, a response goes missing, or write-behind has the worse p99.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+def percentile(samples, p):
+    return statistics.quantiles(samples, n=100, method='inclusive')[p - 1]
+
+def answer(question, n):
+    if question['type'] == 'text':
+        return f'answer {n}'
+    return question['options'][n % len(question['options'])]
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare p99 response latency with and without write-behind')
+    parser.add_argument('--participants', type=int, default=200, help='participants per run')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent submitters')
+    parser.add_argument('--interval-ms', type=int, default=50, help='write-behind flush interval')
+    options = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='submit_latency_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'survey.db')}"
+    import app as survey
+    from app import app, db, load_questions, SurveyResponse
+
+    questions = load_questions()
+
+    def run(mode):
+        clients = []
+        for i in range(options.participants):
+            client = app.test_client()
+            client.post('/start_survey', data={'name': f'{mode}{i}'})
+            clients.append(client)
+        latencies = []
+        failures = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(options.threads)
+
+        def submitter(n):
+            mine = clients[n::options.threads]
+            barrier.wait()
+            for n_question, question in enumerate(questions):
+                for client in mine:
+                    start = time.perf_counter()
+                    response = client.post('/submit_response', json={
+                        'question_id': question['id'], 'response': answer(question, n_question)})
+                    elapsed = (time.perf_counter() - start) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        if response.status_code != 200:
+                            failures.append(response.status_code)
+
+        threads = [threading.Thread(target=submitter, args=(n,)) for n in range(options.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if survey.response_buffer is not None:
+            survey.response_buffer.close()
+        return latencies, failures
+
+    results = {}
+    for mode in ('synchronous', 'write-behind'):
+        if mode == 'write-behind':
+            survey.response_buffer = survey.WriteBehindBuffer(app, survey.flush_responses,
+                                                              interval_ms=options.interval_ms)
+        latencies, failures = run(mode)
+        results[mode] = (percentile(latencies, 50), percentile(latencies, 99), failures)
+
+    with app.app_context():
+        responses = SurveyResponse.query.count()
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    expected = 2 * options.participants * len(questions)
+    for mode, (p50, p99, failures) in results.items():
+        print(f"{mode:>12}: p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  failed {len(failures)}")
+    print(f"responses recorded {responses} of {expected}")
+    if responses != expected or any(failures for _, _, failures in results.values()):
+        print('FAIL: requests failed or responses went missing')
+        sys.exit(1)
+    if results['write-behind'][1] > results['synchronous'][1]:
+        print('FAIL: write-behind has the worse p99')
+        sys.exit(1)
+    print('OK: write-behind p99 is no worse than synchronous commit')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+"""
+Submit concurrency check: one participant answers from many tabs at once
+
+    ./submit_stress.py [--threads 16] [--rounds 20] [--write-behind]
+
+Runs against a throwaway SQLite database. Every thread posts single answers
+to /submit_response and whole batches to /submit_survey for the same
+participant at the same moment. Every request must succeed and the
+participant must end up with exactly one row per question, matching the
+in-memory tally. Exits non-zero otherwise.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+def main():
+    parser = argparse.ArgumentParser(description='Hammer one participant with concurrent submits')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent browser tabs')
+    parser.add_argument('--rounds', type=int, default=20, help='submits per tab')
+    parser.add_argument('--write-behind', action='store_true', help='run with WRITE_BEHIND=1')
+    options = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='submit_stress_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'survey.db')}"
+    if options.write_behind:
+        os.environ['WRITE_BEHIND'] = '1'
+    from sqlalchemy import func
+    from app import app, db, load_questions, tally, response_buffer, SurveyResponse
+
+    questions = load_questions()
+    client = app.test_client()
+    client.post('/start_survey', data={'name': 'stress'})
+    with client.session_transaction() as flask_session:
+        participant_id = flask_session['participant_id']
+
+    def answer(question, n):
+        if question['type'] == 'text':
+            return f'answer {n}'
+        return question['options'][n % len(question['options'])]
+
+    barrier = threading.Barrier(options.threads)
+    results = Counter()
+    results_lock = threading.Lock()
+
+    def tab(n):
+        tab_client = app.test_client()
+        with tab_client.session_transaction() as flask_session:
+            flask_session['participant_id'] = participant_id
+        barrier.wait()
+        for i in range(options.rounds):
+            if (n + i) % 2:
+                question = questions[(n + i) % len(questions)]
+                response = tab_client.post('/submit_response', json={
+                    'question_id': question['id'], 'response': answer(question, n + i)})
+                outcome = 'single' if response.status_code == 200 else f'single {response.status_code}'
+            else:
+                response = tab_client.post('/submit_survey', json={
+                    'responses': {str(q['id']): answer(q, n + i) for q in questions}})
+                outcome = 'batch' if response.status_code == 200 else f'batch {response.status_code}'
+            with results_lock:
+                results[outcome] += 1
+
+    threads = [threading.Thread(target=tab, args=(n,)) for n in range(options.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if response_buffer is not None:
+        response_buffer.wait_for(participant_id)
+
+    with app.app_context():
+        rows = dict(db.session.query(SurveyResponse.question_id, func.count(SurveyResponse.id))
+                    .filter_by(participant_id=participant_id)
+                    .group_by(SurveyResponse.question_id).all())
+        recorded = dict(tally.counts)
+        tally.load()
+        reloaded = dict(tally.counts)
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    mode = 'write-behind' if options.write_behind else 'synchronous'
+    print(f"{options.threads} tabs x {options.rounds} submits ({mode}): {dict(results)}")
+    print(f"rows per question: {rows}")
+    expected = {q['id']: 1 for q in questions}
+    if rows != expected or set(results) - {'single', 'batch'}:
+        print(f"FAIL: expected {expected} and no failed requests")
+        sys.exit(1)
+    if recorded != reloaded:
+        print(f"FAIL: tally {recorded} drifted from the database {reloaded}")
+        sys.exit(1)
+    print('OK: one row per question')
+
+if __name__ == '__main__':
+    main()